@@ -3,7 +3,6 @@
 # ============================================================
 
 import math
-from scipy import stats
 
 
 # ------------------------------------------------------------
@@ -39,8 +38,7 @@ def process_2_unanimous_hold(agent_data):
 # ------------------------------------------------------------
 def process_3_min_conf(agent_data):
     print("\n[Step 3] Rule 1 — Minimum Confidence Threshold")
-    confidences = [d["confidence"] for d in agent_data.values()]
-    min_conf = min(confidences)
+    min_conf = min(d["confidence"] for d in agent_data.values())
     print(f"  min(confidences) = {min_conf:.3f}")
     if min_conf < 0.5:
         print("⚠️ Minimum confidence < 0.5 → Continue debate.")
@@ -54,7 +52,7 @@ def process_3_min_conf(agent_data):
 # ------------------------------------------------------------
 def process_4_conflict(agent_data):
     print("\n[Step 4] Rule 2 — Directional Conflict Check")
-    dirs = [d["direction"] for d in agent_data.values()]
+    dirs = {d["direction"] for d in agent_data.values()}
     if 1 in dirs and -1 in dirs:
         print("⚠️ Found BUY(+1) and SELL(-1) positions.")
         for a1, d1 in agent_data.items():
@@ -95,6 +93,8 @@ def process_6_value(agent_data):
     print(f"  Contributions = {[f'{v:+.3f}' for v in values]}")
     print(f"  Total Value = {total_value:+.3f}")
 
+    from scipy import stats  # deferred: scipy.stats is slow to import and only needed here
+
     t_stat, p_val = stats.ttest_1samp(values, 0)
     print(f"  t-stat = {t_stat:.3f}, p-value = {p_val:.3f}")
 
@@ -4,13 +4,16 @@ Unified data fetchers for Yahoo Finance and FRED.
 Functions:
 - fetch_yahoo_prices(symbols, start, end, interval)
 - fetch_fred_series(series_ids, start, end, api_key_env="FRED_API_KEY")
+- fetch_fundamentals(symbols) / fetch_fundamentals_async(symbols, max_concurrency)
 """
 
 from __future__ import annotations
 
+import asyncio
 import os
+import time
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
 
@@ -95,9 +98,67 @@ def fetch_fred_series(
     return df
 
 
+FUNDAMENTAL_FIELDS = {
+    'sector': 'sector',
+    'industry': 'industry',
+    'market_cap': 'marketCap',
+    'pb_ratio': 'priceToBook',
+    'pe_ratio': 'trailingPE',
+    'roe': 'returnOnEquity',
+    'roa': 'returnOnAssets',
+    'profit_margin': 'profitMargins',
+    'debt_to_equity': 'debtToEquity',
+    'current_ratio': 'currentRatio',
+}
+
+
+# Fundamentals change slowly; reuse a fetched row for this long (seconds) within a process
+FUNDAMENTALS_TTL = 3600.0
+# Most symbols kept at once; the oldest fetches are evicted first
+FUNDAMENTALS_CACHE_SIZE = 512
+# symbol -> (monotonic fetch time, row) in fetch order; only successful fetches are stored
+_fundamentals_cache: Dict[str, Tuple[float, dict]] = {}
+
+
+def _cached_fundamentals(sym: str) -> Optional[dict]:
+    """Copy of the cached row for `sym` if it is still fresh, else None (expired rows are dropped)."""
+    cached = _fundamentals_cache.get(sym)
+    if cached is None:
+        return None
+    if time.monotonic() - cached[0] >= FUNDAMENTALS_TTL:
+        _fundamentals_cache.pop(sym, None)
+        return None
+    return dict(cached[1])
+
+
+def _cache_fundamentals(sym: str, row: dict) -> None:
+    """Store a freshly fetched row, then evict expired entries and anything over the size cap."""
+    now = time.monotonic()
+    # Re-insert so dict order stays oldest fetch first
+    _fundamentals_cache.pop(sym, None)
+    _fundamentals_cache[sym] = (now, row)
+    while _fundamentals_cache:
+        oldest = next(iter(_fundamentals_cache))
+        if (len(_fundamentals_cache) <= FUNDAMENTALS_CACHE_SIZE
+                and now - _fundamentals_cache[oldest][0] < FUNDAMENTALS_TTL):
+            break
+        del _fundamentals_cache[oldest]
+
+
+def _fundamentals_row(sym: str, info: Optional[dict]) -> dict:
+    """Extract key fundamentals from a yfinance `info` dict (None -> all missing)."""
+    info = info or {}
+    row = {'symbol': sym}
+    for col, key in FUNDAMENTAL_FIELDS.items():
+        default = 'Unknown' if col in ('sector', 'industry') else None
+        row[col] = info.get(key, default)
+    return row
+
+
 def fetch_fundamentals(symbols: List[str]) -> pd.DataFrame:
     """
     Fetch fundamental metrics for given symbols using yfinance.
+    Rows fetched within the last FUNDAMENTALS_TTL seconds are reused without a request.
     Returns DataFrame with columns: symbol, sector, pb_ratio, roe, roa, market_cap, pe_ratio
     """
     try:
@@ -105,49 +166,67 @@ def fetch_fundamentals(symbols: List[str]) -> pd.DataFrame:
     except ImportError as e:
         raise ImportError("yfinance is required. Install with `pip install yfinance`. ") from e
     
-    import time
-    
     results = []
-    for i, sym in enumerate(symbols):
+    requested = 0
+    for sym in symbols:
+        cached = _cached_fundamentals(sym)
+        if cached is not None:
+            results.append(cached)
+            continue
         try:
             # Add delay to avoid rate limiting (wait 0.5 seconds between requests)
-            if i > 0:
+            if requested > 0:
                 time.sleep(0.5)
+            requested += 1
             
             ticker = yf.Ticker(sym)
-            info = ticker.info
-            
-            # Extract key fundamentals
-            row = {
-                'symbol': sym,
-                'sector': info.get('sector', 'Unknown'),
-                'industry': info.get('industry', 'Unknown'),
-                'market_cap': info.get('marketCap', None),
-                'pb_ratio': info.get('priceToBook', None),
-                'pe_ratio': info.get('trailingPE', None),
-                'roe': info.get('returnOnEquity', None),
-                'roa': info.get('returnOnAssets', None),
-                'profit_margin': info.get('profitMargins', None),
-                'debt_to_equity': info.get('debtToEquity', None),
-                'current_ratio': info.get('currentRatio', None),
-            }
-            results.append(row)
+            row = _fundamentals_row(sym, ticker.info)
+            _cache_fundamentals(sym, row)
+            results.append(dict(row))
         except Exception as e:
             print(f"⚠️ Could not fetch fundamentals for {sym}: {e}")
-            results.append({
-                'symbol': sym,
-                'sector': 'Unknown',
-                'industry': 'Unknown',
-                'market_cap': None,
-                'pb_ratio': None,
-                'pe_ratio': None,
-                'roe': None,
-                'roa': None,
-                'profit_margin': None,
-                'debt_to_equity': None,
-                'current_ratio': None,
-            })
+            results.append(_fundamentals_row(sym, None))
     
     return pd.DataFrame(results)
 
 
+async def fetch_fundamentals_async(
+    symbols: List[str],
+    max_concurrency: int = 4,
+    retries: int = 3,
+    backoff: float = 1.0,
+) -> pd.DataFrame:
+    """
+    Concurrent version of `fetch_fundamentals`.
+    Runs up to `max_concurrency` Yahoo requests at once (each in a worker thread) and
+    retries failed requests with exponential backoff to ride out rate limiting.
+    Rows fetched within the last FUNDAMENTALS_TTL seconds are reused without a request.
+    Rows are returned in the order of `symbols`.
+    """
+    try:
+        import yfinance as yf
+    except ImportError as e:
+        raise ImportError("yfinance is required. Install with `pip install yfinance`. ") from e
+
+    sem = asyncio.Semaphore(max_concurrency)
+
+    async def _fetch_one(sym: str) -> dict:
+        cached = _cached_fundamentals(sym)
+        if cached is not None:
+            return cached
+        async with sem:
+            for attempt in range(retries):
+                try:
+                    info = await asyncio.to_thread(lambda: yf.Ticker(sym).info)
+                    row = _fundamentals_row(sym, info)
+                    _cache_fundamentals(sym, row)
+                    return dict(row)
+                except Exception as e:
+                    if attempt == retries - 1:
+                        print(f"⚠️ Could not fetch fundamentals for {sym}: {e}")
+                        break
+                    await asyncio.sleep(backoff * (2 ** attempt))
+        return _fundamentals_row(sym, None)
+
+    results = await asyncio.gather(*[_fetch_one(sym) for sym in symbols])
+    return pd.DataFrame(results)
@@ -4,18 +4,25 @@ Shows real agent conversations and consensus building
 """
 
 import asyncio
-import random
+import contextvars
+import re
+import sys
 import time
 import os
+from collections import Counter
+from dataclasses import dataclass, field
 from datetime import datetime
+from functools import reduce
+from typing import List, Optional
 import pandas as pd
 import numpy as np
+from matplotlib.figure import Figure  # charts are only saved to PNG: no pyplot, no global backend
 from autogen_agentchat.agents import AssistantAgent
+from autogen_agentchat.base import TaskResult
+from autogen_agentchat.messages import ModelClientStreamingChunkEvent, TextMessage
 from autogen_agentchat.teams import RoundRobinGroupChat
-from autogen_ext.models.ollama import OllamaChatCompletionClient
-from indicator_forecaster import IndicatorForecaster
-from macro_var_analyzer import MacroVARAnalyzer
-from data_fetchers import fetch_yahoo_prices, fetch_fundamentals
+from autogen_core import CancellationToken
+from data_fetchers import fetch_yahoo_prices, fetch_fundamentals_async
 from portfolio_constructor import equal_weight_weights, inverse_vol_weights
 from backtester import run_backtest
 from sector_comparator import SectorComparator
@@ -40,29 +47,9 @@ from consensus_mechanism import (
 )
 
 
-class InteractiveFinancialInterface:
-    
-    def __init__(self):
-        self.ollama_client = None
-        self.agents = {}
-        self.conversation_history = []
-        self.indicator_forecaster = IndicatorForecaster()
-        self.macro_analyzer = MacroVARAnalyzer()
-        self.sector_comparator = SectorComparator()
-        self.arima_regime = ARIMARegimeSwitching()
-        
-    async def initialize_agents(self):
-        """Initialize the two financial agents (Wassim and Yugo)"""
-        print("Initializing AI agents...")
-        
-        self.ollama_client = OllamaChatCompletionClient(model="llama3.2")
-        
-        # Create specialized agents with personality
-        self.agents = {
-            'fundamental': AssistantAgent(
-                name="Wassim_Fundamental_Agent",
-                model_client=self.ollama_client,
-                system_message="""You are Wassim, an integrated valuation and fundamental analysis expert (male, age 48).  
+# Agent system prompts. Kept byte-identical across sessions so the Ollama server can reuse
+# the already-evaluated prompt prefix instead of re-prefilling it on every turn.
+WASSIM_SYSTEM_MESSAGE = """You are Wassim, an integrated valuation and fundamental analysis expert (male, age 48).  
 Education: Bachelor's and Master's degrees in Economics, specializing in Financial Econometrics and Quantitative Finance.  
 Career Background: Former equity research analyst and portfolio strategist at leading asset management firms, experienced in valuation modeling, macroeconomic analysis, and cross-asset allocation.  
 
@@ -99,12 +86,8 @@ CONFIDENCE: 0.85
 Always provide comprehensive analysis with specific numbers, percentages, and detailed reasoning for each stock pick.
 Be conversational but professional in your responses. Address other agents by name when responding to them.
 Format your analysis with clear sections and bullet points for readability."""
-            ),
-            
-            'valuation': AssistantAgent(
-                name="Yugo_Valuation_Agent",
-                model_client=self.ollama_client,
-                system_message="""You are Yugo, a quantitative and technical analysis expert (male, age 46).  
+
+YUGO_SYSTEM_MESSAGE = """You are Yugo, a quantitative and technical analysis expert (male, age 46).  
 Education: Bachelor's in Computer Science and Master's in Computational Engineering, specializing in Machine Learning and Time-Series Forecasting.  
 Career Background: Former quantitative researcher and data scientist at a global hedge fund and AI research lab, specializing in predictive modeling, algorithmic trading, and statistical forecasting systems.  
 
@@ -151,14 +134,262 @@ CONFIDENCE: 0.78
 Always provide comprehensive quantitative analysis with specific numbers, models, price targets, and detailed reasoning for each stock pick.
 Be analytical but accessible in your responses. Address other agents by name when responding to them.
 Format your analysis with clear sections and bullet points for readability."""
+
+# Task given to both agents at the start of a debate
+DEBATE_TASK_TEMPLATE = """Analysis Request: {user_prompt}
+
+Stock Symbol: {stock_symbol}
+
+Instructions:
+1. Each agent will speak a maximum of 3 times in total (3 rounds of discussion)
+2. In your first turn, provide your initial analysis and recommendation
+3. In subsequent turns, respond to other agents and work towards consensus
+4. Listen to other agents' perspectives and engage in constructive debate
+5. Challenge assumptions and ask probing questions
+6. Look for common ground and areas of agreement
+7. Work towards building a consensus recommendation
+8. The discussion will automatically terminate after each agent has spoken 3 times
+
+
+Please begin with your initial analyses and then engage in discussion to reach consensus."""
+
+# Sector-selection prompt sent into the debate; ARIMA notes (if any) and PICKS_FORMAT_FOOTER are appended
+SECTOR_PROMPT_TEMPLATE = """
+Sector Portfolio Selection: {sector}
+
+**YOUR PRIMARY TASK**: Select AT LEAST 7-8 stocks from the {n_symbols} stocks below to include in a portfolio.
+
+Available stocks: {symbols}
+
+Wassim: Focus on relative valuation using sector comparison data. Pick stocks with:
+- High quality fundamentals (ROE/ROA in top percentiles)
+- Attractive valuations (PBR at discount relative to quality)
+- Strong composite scores
+IMPORTANT: You MUST pick at least 7-8 stocks for adequate diversification.
+
+Yugo: Focus on ARIMA regime-switching forecasts and technical dynamics. Pick stocks with:
+- Favorable volatility regimes (low/medium vol preferred over high vol)
+- Positive forecast outlook
+- Good risk-adjusted return potential
+IMPORTANT: You MUST pick at least 7-8 stocks for adequate diversification.
+
+Both: Debate each stock's merits. At the end, EACH agent must provide:
+1. Your specific stock picks (MINIMUM 7-8 stocks): MY PICKS: [SYMBOL1, SYMBOL2, SYMBOL3, ...]
+2. Your confidence level: CONFIDENCE: 0.XX
+
+📊 Sector Comparison Data:
+{sector_report}
+
+🏆 Top Ranked Stocks (by composite score):
+{ranking_table}
+"""
+
+# Closing instructions that pin down the MY PICKS / CONFIDENCE lines the parser expects
+PICKS_FORMAT_FOOTER = """
+CRITICAL: You must provide your final stock selections using this exact format:
+MY PICKS: [SYMBOL1, SYMBOL2, SYMBOL3, SYMBOL4, SYMBOL5, SYMBOL6, SYMBOL7, SYMBOL8]
+CONFIDENCE: 0.XX
+
+REMEMBER: Pick AT LEAST 7-8 stocks (you can pick more if confident).
+Explain WHY you picked each stock and WHY you excluded others.
+"""
+
+# How long Ollama keeps llama3.2 (and its prompt cache) loaded between requests
+OLLAMA_KEEP_ALIVE = "30m"
+
+
+def _make_ollama_client():
+    """Ollama client for the agents. Imported here so module import and start-up don't pay for autogen_ext."""
+    from autogen_ext.models.ollama import OllamaChatCompletionClient
+    return OllamaChatCompletionClient(model="llama3.2", keep_alive=OLLAMA_KEEP_ALIVE)
+
+
+async def _warm_up_ollama(client):
+    """Send a one-token request so Ollama loads the model while data is still being fetched. Best effort."""
+    from autogen_core.models import UserMessage
+    try:
+        await client.create([UserMessage(content="ping", source="user")],
+                            extra_create_args={"options": {"num_predict": 1}})
+    except Exception:
+        pass
+
+# Old-format consensus line: CONSENSUS: direction=X confidence=Y.Z reliability=W.V
+_CONSENSUS_RE = re.compile(r'CONSENSUS:\s*direction=\+?(-?\d+)[,;\s]+confidence=(\d*\.?\d+)[,;\s]+reliability=(\d*\.?\d+)')
+
+# Recommendation keywords for the fallback tally, found case-insensitively in one scan:
+# group 1 = explicit "RECOMMEND X" / "RECOMMENDATION: X", group 2 = bare keyword
+_RECOMMENDATION_RE = re.compile(r'RECOMMEND(?:ATION:)? (BUY|SELL|HOLD)|(BUY|SELL|DEBATE)', re.IGNORECASE)
+
+# New-format pick lines: "MY PICKS: [A, B, ...]" (brackets optional) and "CONFIDENCE: 0.XX".
+# The colon form of CONFIDENCE is preferred when both appear.
+_PICKS_RE = re.compile(r'MY PICKS:\s*\[([^\]]+)\]', re.IGNORECASE)
+_PICKS_BARE_RE = re.compile(r'MY PICKS:\s*([A-Z, ]+)', re.IGNORECASE)
+_CONFIDENCE_RES = (
+    re.compile(r'CONFIDENCE:\s*(\d*\.?\d+)', re.IGNORECASE),
+    re.compile(r'CONFIDENCE\s*(\d*\.?\d+)', re.IGNORECASE),
+)
+
+# Agent direction -> recommendation label
+_DIRECTION_LABELS = {1: 'BUY', -1: 'SELL', 0: 'HOLD'}
+
+# Consensus gates checked in order; the first one that fails keeps the debate going
+_CONSENSUS_GATES = (
+    (process_3_min_conf, "Low confidence"),
+    (process_4_conflict, "Strong conflict"),
+    (process_5_vibe, "Weak overall alignment"),
+)
+
+
+# Line prefix for output written by the current run_many worker ('' outside run_many)
+_output_prefix = contextvars.ContextVar('output_prefix', default='')
+
+
+class _PrefixedStdout:
+    """stdout wrapper that writes whole lines, each starting with the writing task's _output_prefix.
+    A prefixed writer's partial line (e.g. streamed tokens) is held until its newline or close()."""
+    
+    def __init__(self, stream):
+        self._stream = stream
+        # Prefix -> text written after that writer's last newline
+        self._pending = {}
+    
+    def write(self, text):
+        prefix = _output_prefix.get()
+        if not prefix:
+            return self._stream.write(text)
+        *lines, rest = (self._pending.pop(prefix, "") + text).split("\n")
+        if rest:
+            self._pending[prefix] = rest
+        if lines:
+            self._stream.write("".join(f"{prefix}{line}\n" if line else "\n" for line in lines))
+        return len(text)
+    
+    def close(self):
+        """Write out any held partial lines; the wrapped stream stays open"""
+        for prefix, rest in self._pending.items():
+            self._stream.write(f"{prefix}{rest}\n")
+        self._pending.clear()
+    
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def _rolling_mean_std(values: np.ndarray, window: int):
+    """
+    Trailing-window mean and sample std (ddof=1) of a 1-D array, NaN until the window fills.
+    Uses bottleneck's moving-window kernels when installed, otherwise pandas rolling.
+    """
+    if len(values) >= window:
+        try:
+            import bottleneck as bn
+            return bn.move_mean(values, window), bn.move_std(values, window, ddof=1)
+        except ImportError:
+            pass
+    rolling = pd.Series(values).rolling(window=window)
+    return rolling.mean().to_numpy(), rolling.std().to_numpy()
+
+
+# Default US Technology universe (15 names)
+DEFAULT_TECH_UNIVERSE = [
+    "AAPL","MSFT","NVDA","GOOGL","META","AMD","AVGO","CRM","ORCL","INTC",
+    "TXN","AMAT","MU","ADI","PANW",
+]
+
+
+@dataclass
+class RunConfig:
+    """Answers to the sector-analysis prompts, for running the pipeline without stdin"""
+    symbols: List[str] = field(default_factory=lambda: list(DEFAULT_TECH_UNIVERSE))
+    start: str = "2020-01-01"
+    end: str = field(default_factory=lambda: datetime.today().strftime('%Y-%m-%d'))
+    construct: bool = True
+    strategy: str = "mpt"
+    freq: str = "M"
+    use_oos: bool = True
+    compare_in_sample: bool = False
+
+
+class InteractiveFinancialInterface:
+    
+    def __init__(self):
+        self.ollama_client = None
+        self.agents = {}
+        self.conversation_history = []
+        # Fallback BUY/SELL/HOLD tally, kept up to date as turns are recorded
+        self._running_recommendations = {'BUY': 0, 'SELL': 0, 'HOLD': 0}
+        self._agent_positions = {}
+        # Built on first use: importing them pulls in scikit-learn and statsmodels
+        self._indicator_forecaster = None
+        self._macro_analyzer = None
+        self.sector_comparator = SectorComparator()
+        self.arima_regime = ARIMARegimeSwitching()
+        # Per-message pause in the debate stream; opt in with AGENT_CLI_PRETTY=1
+        self.visual_delay = 0.5 if os.environ.get('AGENT_CLI_PRETTY') == '1' else 0.0
+        # Added to chart filenames so concurrent run_many workers never share one
+        self.run_tag = ""
+        # Full tracebacks on handled errors; opt in with AGENT_CLI_VERBOSE=1
+        self.verbose = os.environ.get('AGENT_CLI_VERBOSE') == '1'
+        # (sender, content) extractors cached per streamed message type
+        self._msg_extractors = {}
+        # Agent name -> (short name, display label)
+        self._agent_display = {
+            'Wassim_Fundamental_Agent': ('Wassim', '🧮 Wassim (Fundamental Agent)'),
+            'Yugo_Valuation_Agent': ('Yugo', '📈 Yugo (Valuation Agent)'),
+        }
+        # Short agent name -> speaking position, derived once from _agent_display
+        self._agent_rank = {short: i for i, (short, _) in enumerate(self._agent_display.values())}
+        
+    @property
+    def indicator_forecaster(self):
+        if self._indicator_forecaster is None:
+            from indicator_forecaster import IndicatorForecaster
+            self._indicator_forecaster = IndicatorForecaster()
+        return self._indicator_forecaster
+    
+    @property
+    def macro_analyzer(self):
+        if self._macro_analyzer is None:
+            from macro_var_analyzer import MacroVARAnalyzer
+            self._macro_analyzer = MacroVARAnalyzer()
+        return self._macro_analyzer
+    
+    async def initialize_agents(self):
+        """Initialize the two financial agents (Wassim and Yugo); later calls reuse them"""
+        if self.ollama_client is not None and self.agents:
+            # Reuse the client and agents, but start the new debate from a clean context
+            await asyncio.gather(*(agent.on_reset(CancellationToken()) for agent in self.agents.values()))
+            return
+        
+        print("Initializing AI agents...")
+        
+        if self.ollama_client is None:
+            self.ollama_client = _make_ollama_client()
+        
+        # Create specialized agents with personality
+        self.agents = {
+            'fundamental': AssistantAgent(
+                name="Wassim_Fundamental_Agent",
+                model_client=self.ollama_client,
+                system_message=WASSIM_SYSTEM_MESSAGE,
+                # Emit tokens as they arrive so the debate can be printed while it is generated
+                model_client_stream=True,
+            ),
+            
+            'valuation': AssistantAgent(
+                name="Yugo_Valuation_Agent",
+                model_client=self.ollama_client,
+                system_message=YUGO_SYSTEM_MESSAGE,
+                model_client_stream=True,
             )
         }
         
         print("✅ Agents initialized successfully!")
+        print("💡 Opening analyses run in parallel; set OLLAMA_NUM_PARALLEL=2 and OLLAMA_MAX_LOADED_MODELS=1 on the Ollama server to overlap them.")
     
-    async def run_sector_portfolio_analysis(self):
+    async def run_sector_portfolio_analysis(self, cfg: Optional[RunConfig] = None):
         """
         Integrated sector-based portfolio analysis with agent debate.
+        With cfg=None every choice is prompted for; with a RunConfig the run is headless.
         
         Workflow:
         1. User picks stocks in same sector (recommend 5-10)
@@ -171,35 +402,37 @@ Format your analysis with clear sections and bullet points for readability."""
         
         Outputs: Agent debate transcript, consensus filter, portfolio metrics, equity curves
         """
+        # Background work started below; settled in `finally` whichever way the run ends
+        warmup = prices_task = None
         try:
             print("\n🏢 Sector Portfolio Analysis & Agent Debate")
             print("=" * 80)
             
-            # Get stock symbols
-            symbols_str = input("Enter 10 stock tickers in the same sector (comma-separated, e.g., AAPL,MSFT,...): ").strip()
-            if not symbols_str:
-                # Default US Technology universe (15 names)
-                symbols = [
-                    "AAPL","MSFT","NVDA","GOOGL","META","AMD","AVGO","CRM","ORCL","INTC",
-                    "TXN","AMAT","MU","ADI","PANW",
-                ]
-                print(f"Using default Technology universe: {', '.join(symbols)}")
-            else:
-                symbols = [s.strip().upper() for s in symbols_str.split(',') if s.strip()]
+            interactive = cfg is None
+            if interactive:
+                cfg = self._prompt_run_config()
+            symbols, start, end = cfg.symbols, cfg.start, cfg.end
             
             if len(symbols) < 2:
                 print("❌ Please provide at least 2 tickers for comparison.")
                 return
             
-            start = input("Start date [YYYY-MM-DD, default 2020-01-01]: ").strip() or "2020-01-01"
-            end = input("End date [YYYY-MM-DD, default today]: ").strip() or datetime.today().strftime('%Y-%m-%d')
+            # Load the model in the background; it is only needed once the data is in
+            if self.ollama_client is None:
+                self.ollama_client = _make_ollama_client()
+            warmup = asyncio.create_task(_warm_up_ollama(self.ollama_client))
+            
+            # Price history doesn't depend on the fundamentals: download it in a worker thread meanwhile
+            prices_task = asyncio.create_task(
+                asyncio.to_thread(fetch_yahoo_prices, symbols, start=start, end=end, interval="1d")
+            )
             
             print(f"\n⬇️  Fetching fundamentals for {len(symbols)} stocks...")
-            print("⏳ Please wait, adding delays to avoid rate limiting...")
-            fundamentals_df = fetch_fundamentals(symbols)
+            print("⏳ Please wait, fetching concurrently with rate-limit backoff...")
+            fundamentals_df = await fetch_fundamentals_async(symbols)
             
             # Check if we got valid data
-            valid_data_count = fundamentals_df[['pb_ratio', 'roe', 'roa']].notna().any(axis=1).sum()
+            valid_data_count = int(fundamentals_df[['pb_ratio', 'roe', 'roa']].notna().to_numpy().any(axis=1).sum())
             if valid_data_count == 0:
                 print("\n⚠️  WARNING: No fundamental data retrieved (Yahoo Finance rate limit likely hit)")
                 print("💡 Try waiting a few minutes and running again, or use fewer stocks")
@@ -218,6 +451,8 @@ Format your analysis with clear sections and bullet points for readability."""
             
             # Sector comparison
             print("\n📊 Running sector comparison analysis...")
+            sector_report = 'N/A'
+            ranking_table = 'N/A'
             if self.sector_comparator.load_fundamentals(fundamentals_df):
                 sector_comp_df = self.sector_comparator.compute_sector_comparison()
                 sector_report = self.sector_comparator.format_comparison_report()
@@ -225,36 +460,38 @@ Format your analysis with clear sections and bullet points for readability."""
                 
                 # Get rankings
                 rankings = self.sector_comparator.get_sector_rankings()
+                ranking_table = rankings[['symbol', 'composite_score', 'pb_ratio', 'roe', 'roa']].head(10).to_string(index=False)
                 print("\n🏆 Sector Rankings (by composite score):")
-                print(rankings[['symbol', 'composite_score', 'pb_ratio', 'roe', 'roa']].head(10).to_string(index=False))
+                print(ranking_table)
             
             # Fetch price data
             print(f"\n⬇️  Fetching price data from {start} to {end}...")
-            price_dict = fetch_yahoo_prices(symbols, start=start, end=end, interval="1d")
+            price_dict = await prices_task
             
             # Build price DataFrame with clean single-level column index
-            frames = []
-            valid_symbols = []
+            series = {}
             for sym in symbols:
                 df = price_dict.get(sym, None)
                 if df is not None and not df.empty and 'adj_close' in df.columns:
-                    # Extract as Series to avoid MultiIndex issues
-                    price_series = df['adj_close'].copy()
-                    price_series.name = sym
-                    frames.append(price_series)
-                    valid_symbols.append(sym)
+                    adj = df['adj_close']
+                    # yfinance may return (field, ticker) columns, leaving a one-column frame
+                    if isinstance(adj, pd.DataFrame):
+                        adj = adj.iloc[:, 0]
+                    series[sym] = adj
+            valid_symbols = list(series)
             
-            if not frames:
+            if not series:
                 print("❌ No valid price data downloaded.")
                 return
             
-            # Concatenate Series into DataFrame with simple column index
-            price_df = pd.concat(frames, axis=1)
+            # Align every symbol on one master index and allocate the frame once
+            master_index = reduce(pd.Index.union, (s.index for s in series.values()))
+            arr = np.column_stack([s.reindex(master_index).to_numpy(dtype=float) for s in series.values()])
+            price_df = pd.DataFrame(arr, index=master_index, columns=valid_symbols)
             price_df = price_df.dropna(how='all')
-            
-            # Ensure we have a simple Index (not MultiIndex) on columns
-            if isinstance(price_df.columns, pd.MultiIndex):
-                price_df.columns = price_df.columns.get_level_values(-1)
+            # Contiguous float64 panel + symbol -> column position, for slicing without label alignment
+            price_arr = price_df.to_numpy(dtype=np.float64, copy=False)
+            col_pos = {sym: i for i, sym in enumerate(price_df.columns)}
             
             print(f"✅ Price data fetched: {price_df.shape[0]} days, {price_df.shape[1]} stocks")
             
@@ -263,13 +500,9 @@ Format your analysis with clear sections and bullet points for readability."""
             if len(valid_symbols) > 0:
                 rep_symbol = valid_symbols[0]
                 print(f"\n🔮 Running ARIMA regime-switching forecast for {rep_symbol}...")
-                # Extract series properly and ensure it's a simple Series with datetime index
-                rep_prices = price_df[rep_symbol].dropna()
-                # Convert to simple Series if needed (remove any MultiIndex issues)
-                if isinstance(rep_prices.index, pd.MultiIndex):
-                    rep_prices = rep_prices.reset_index(drop=True)
-                # Ensure it's a Series with proper name
-                rep_prices.name = rep_symbol
+                col = price_arr[:, col_pos[rep_symbol]]
+                has_price = ~np.isnan(col)
+                rep_prices = pd.Series(col[has_price], index=price_df.index[has_price], name=rep_symbol)
                 
                 if self.arima_regime.load_data(rep_prices):
                     self.arima_regime.detect_regimes()
@@ -279,51 +512,23 @@ Format your analysis with clear sections and bullet points for readability."""
                     print(arima_report)
             
             # Initialize agents
-            await self.initialize_agents()
+            await asyncio.gather(warmup, self.initialize_agents())
             
             # Build analysis prompt for agents
-            sector = fundamentals_df['sector'].mode()[0] if not fundamentals_df['sector'].mode().empty else 'Unknown'
-            prompt = f"""
-Sector Portfolio Selection: {sector}
-
-**YOUR PRIMARY TASK**: Select AT LEAST 7-8 stocks from the {len(valid_symbols)} stocks below to include in a portfolio.
-
-Available stocks: {', '.join(valid_symbols)}
-
-Wassim: Focus on relative valuation using sector comparison data. Pick stocks with:
-- High quality fundamentals (ROE/ROA in top percentiles)
-- Attractive valuations (PBR at discount relative to quality)
-- Strong composite scores
-IMPORTANT: You MUST pick at least 7-8 stocks for adequate diversification.
-
-Yugo: Focus on ARIMA regime-switching forecasts and technical dynamics. Pick stocks with:
-- Favorable volatility regimes (low/medium vol preferred over high vol)
-- Positive forecast outlook
-- Good risk-adjusted return potential
-IMPORTANT: You MUST pick at least 7-8 stocks for adequate diversification.
-
-Both: Debate each stock's merits. At the end, EACH agent must provide:
-1. Your specific stock picks (MINIMUM 7-8 stocks): MY PICKS: [SYMBOL1, SYMBOL2, SYMBOL3, ...]
-2. Your confidence level: CONFIDENCE: 0.XX
-
-📊 Sector Comparison Data:
-{sector_report}
-
-🏆 Top Ranked Stocks (by composite score):
-{rankings[['symbol', 'composite_score', 'pb_ratio', 'roe', 'roa']].head(10).to_string(index=False) if 'rankings' in locals() else 'N/A'}
-"""
+            sector_mode = fundamentals_df['sector'].mode()
+            sector = sector_mode.iat[0] if len(sector_mode) > 0 else 'Unknown'
+            prompt = SECTOR_PROMPT_TEMPLATE.format(
+                sector=sector,
+                n_symbols=len(valid_symbols),
+                symbols=', '.join(valid_symbols),
+                sector_report=sector_report,
+                ranking_table=ranking_table,
+            )
             
             if arima_report:
                 prompt += f"\n\n🔮 ARIMA Regime-Switching Analysis ({rep_symbol}):\n{arima_report}\n"
             
-            prompt += """
-CRITICAL: You must provide your final stock selections using this exact format:
-MY PICKS: [SYMBOL1, SYMBOL2, SYMBOL3, SYMBOL4, SYMBOL5, SYMBOL6, SYMBOL7, SYMBOL8]
-CONFIDENCE: 0.XX
-
-REMEMBER: Pick AT LEAST 7-8 stocks (you can pick more if confident).
-Explain WHY you picked each stock and WHY you excluded others.
-"""
+            prompt += PICKS_FORMAT_FOOTER
             
             # Run agent debate
             result = await self.run_analysis_with_debate(prompt, f"{sector} Sector")
@@ -355,10 +560,13 @@ Explain WHY you picked each stock and WHY you excluded others.
             print("=" * 80)
             
             # Construct portfolio from agent-selected stocks
-            construct = input("\nConstruct and backtest portfolio from agent-selected stocks? [y/N]: ").strip().lower()
-            if construct in ['y', 'yes']:
+            if interactive:
+                construct = input("\nConstruct and backtest portfolio from agent-selected stocks? [y/N]: ").strip().lower() in ['y', 'yes']
+            else:
+                construct = cfg.construct
+            if construct:
                 # Filter to stocks that exist in price data
-                portfolio_symbols = [s for s in selected_stocks if s in price_df.columns]
+                portfolio_symbols = [s for s in selected_stocks if s in col_pos]
                 
                 if len(portfolio_symbols) < 2:
                     print("❌ Not enough valid stocks for portfolio.")
@@ -367,14 +575,19 @@ Explain WHY you picked each stock and WHY you excluded others.
                 print(f"\n🧮 Constructing portfolio from {len(portfolio_symbols)} agent-selected stocks:")
                 print(f"   {', '.join(portfolio_symbols)}")
                 
-                portfolio_prices = price_df[portfolio_symbols].dropna()
-                
-                strategy = input("\nStrategy [equal|invvol|mpt] (default mpt): ").strip().lower() or "mpt"
-                freq = input("Rebalance frequency [D/W/M/Q] (default M): ").strip().upper() or "M"
+                block = price_arr[:, [col_pos[s] for s in portfolio_symbols]]
+                complete = ~np.isnan(block).any(axis=1)
+                portfolio_prices = pd.DataFrame(block[complete], index=price_df.index[complete], columns=portfolio_symbols)
                 
-                # Ask user if they want out-of-sample validation
-                use_oos = input("\n🔬 Use OUT-OF-SAMPLE rolling optimization? [Y/n]: ").strip().lower()
-                use_oos = use_oos != 'n'  # Default to yes
+                if interactive:
+                    strategy = input("\nStrategy [equal|invvol|mpt] (default mpt): ").strip().lower() or "mpt"
+                    freq = input("Rebalance frequency [D/W/M/Q] (default M): ").strip().upper() or "M"
+                    
+                    # Ask user if they want out-of-sample validation
+                    use_oos = input("\n🔬 Use OUT-OF-SAMPLE rolling optimization? [Y/n]: ").strip().lower()
+                    use_oos = use_oos != 'n'  # Default to yes
+                else:
+                    strategy, freq, use_oos = cfg.strategy, cfg.freq, cfg.use_oos
                 
                 if use_oos:
                     print("\n" + "=" * 80)
@@ -475,8 +688,11 @@ Explain WHY you picked each stock and WHY you excluded others.
                 
                 # Optionally compare with in-sample if user chose out-of-sample
                 if use_oos:
-                    compare = input("\n🔍 Compare with IN-SAMPLE baseline? [y/N]: ").strip().lower()
-                    if compare in ['y', 'yes']:
+                    if interactive:
+                        compare = input("\n🔍 Compare with IN-SAMPLE baseline? [y/N]: ").strip().lower() in ['y', 'yes']
+                    else:
+                        compare = cfg.compare_in_sample
+                    if compare:
                         print("\n📊 Running IN-SAMPLE comparison (using all data)...")
                         try:
                             # Run in-sample for comparison
@@ -523,78 +739,75 @@ Explain WHY you picked each stock and WHY you excluded others.
                             )
                         except Exception as e:
                             print(f"⚠️ Could not run in-sample comparison: {e}")
-                            import traceback
-                            traceback.print_exc()
+                            if self.verbose:
+                                import traceback
+                                traceback.print_exc()
+                
+                # All three charts share one figure; each clears the axes before drawing
+                fig = Figure(figsize=(12, 5))
+                ax = fig.subplots()
                 
                 # Save equity curve
                 try:
-                    import matplotlib.pyplot as plt
                     validation_label = "OOS" if oos_validated else "In-Sample"
-                    plt.figure(figsize=(12, 5))
-                    res.equity_curve.plot(linewidth=2)
-                    plt.title(f"{sector} Sector Portfolio Equity Curve ({validation_label})")
-                    plt.xlabel("Date"); plt.ylabel("Equity")
-                    plt.grid(alpha=0.3)
-                    out = f"sector_portfolio_{sector.replace(' ', '_')}_{validation_label}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-                    plt.tight_layout(); plt.savefig(out, dpi=200); plt.close()
+                    ax.clear()
+                    ax.plot(res.equity_curve.index, res.equity_curve.values, linewidth=2)
+                    ax.set_title(f"{sector} Sector Portfolio Equity Curve ({validation_label})")
+                    ax.set_xlabel("Date"); ax.set_ylabel("Equity")
+                    ax.grid(alpha=0.3)
+                    out = self._chart_filename("sector_portfolio", sector.replace(' ', '_'), validation_label)
+                    self._save_figure(fig, out)
                     print(f"\n🖼️  Saved: {out}")
                 except Exception as e:
                     print(f"⚠️ Could not save plot: {e}")
                 
                 # Save cumulative return chart
                 try:
-                    import matplotlib.pyplot as plt
-                    import numpy as np
-                    
                     cumulative_return = (res.equity_curve - 1) * 100  # Convert to percentage
                     
-                    plt.figure(figsize=(12, 5))
-                    plt.plot(cumulative_return.index, cumulative_return.values, linewidth=2, color='#2E86AB')
-                    plt.title(f"Cumulative Return of Portfolio ({sector} Sector)", fontsize=14, fontweight='bold')
-                    plt.xlabel("Date", fontsize=12)
-                    plt.ylabel("Cumulative Return (%)", fontsize=12)
-                    plt.grid(alpha=0.3, linestyle='--')
-                    plt.axhline(y=0, color='black', linestyle='-', linewidth=0.8, alpha=0.5)
+                    ax.clear()
+                    ax.plot(cumulative_return.index, cumulative_return.values, linewidth=2, color='#2E86AB')
+                    ax.set_title(f"Cumulative Return of Portfolio ({sector} Sector)", fontsize=14, fontweight='bold')
+                    ax.set_xlabel("Date", fontsize=12)
+                    ax.set_ylabel("Cumulative Return (%)", fontsize=12)
+                    ax.grid(alpha=0.3, linestyle='--')
+                    ax.axhline(y=0, color='black', linestyle='-', linewidth=0.8, alpha=0.5)
                     
-                    out_cum = f"cumulative_return_{sector.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-                    plt.tight_layout()
-                    plt.savefig(out_cum, dpi=200, bbox_inches='tight')
-                    plt.close()
+                    out_cum = self._chart_filename("cumulative_return", sector.replace(' ', '_'))
+                    self._save_figure(fig, out_cum)
                     print(f"🖼️  Saved: {out_cum}")
                 except Exception as e:
                     print(f"⚠️ Could not save cumulative return plot: {e}")
                 
                 # Save rolling Sharpe ratio chart
                 try:
-                    import matplotlib.pyplot as plt
-                    import numpy as np
-                    
-                    # Calculate daily returns
-                    daily_returns = res.equity_curve.pct_change().dropna()
+                    # Calculate daily log returns
+                    ec = res.equity_curve.to_numpy(dtype=np.float64, copy=False)
+                    lr = np.diff(np.log(ec))
                     
                     # Calculate rolling Sharpe ratio (60-day window, annualized)
                     rolling_window = 60
-                    rolling_mean = daily_returns.rolling(window=rolling_window).mean() * 252
-                    rolling_std = daily_returns.rolling(window=rolling_window).std() * np.sqrt(252)
-                    rolling_sharpe = rolling_mean / rolling_std.replace(0, np.nan)
-                    rolling_sharpe = rolling_sharpe.dropna()
+                    rolling_mean, rolling_std = _rolling_mean_std(lr, rolling_window)
+                    m = rolling_mean * 252
+                    s = rolling_std * np.sqrt(252)
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        sharpe_arr = np.where(s > 0, m / s, np.nan)
+                    rolling_sharpe = pd.Series(sharpe_arr, index=res.equity_curve.index[1:]).dropna()
                     
                     if len(rolling_sharpe) > 0:
-                        plt.figure(figsize=(12, 5))
-                        plt.plot(rolling_sharpe.index, rolling_sharpe.values, linewidth=2, color='#A23B72')
-                        plt.title(f"Rolling Sharpe Ratio of Portfolio ({sector} Sector, {rolling_window}-day window)", fontsize=14, fontweight='bold')
-                        plt.xlabel("Date", fontsize=12)
-                        plt.ylabel("Rolling Sharpe Ratio", fontsize=12)
-                        plt.grid(alpha=0.3, linestyle='--')
-                        plt.axhline(y=0, color='black', linestyle='-', linewidth=0.8, alpha=0.5)
-                        plt.axhline(y=1, color='green', linestyle='--', linewidth=0.8, alpha=0.5, label='Sharpe=1.0')
-                        plt.axhline(y=2, color='darkgreen', linestyle='--', linewidth=0.8, alpha=0.5, label='Sharpe=2.0')
-                        plt.legend(loc='best')
+                        ax.clear()
+                        ax.plot(rolling_sharpe.index, rolling_sharpe.values, linewidth=2, color='#A23B72')
+                        ax.set_title(f"Rolling Sharpe Ratio of Portfolio ({sector} Sector, {rolling_window}-day window)", fontsize=14, fontweight='bold')
+                        ax.set_xlabel("Date", fontsize=12)
+                        ax.set_ylabel("Rolling Sharpe Ratio", fontsize=12)
+                        ax.grid(alpha=0.3, linestyle='--')
+                        ax.axhline(y=0, color='black', linestyle='-', linewidth=0.8, alpha=0.5)
+                        ax.axhline(y=1, color='green', linestyle='--', linewidth=0.8, alpha=0.5, label='Sharpe=1.0')
+                        ax.axhline(y=2, color='darkgreen', linestyle='--', linewidth=0.8, alpha=0.5, label='Sharpe=2.0')
+                        ax.legend(loc='best')
                         
-                        out_sharpe = f"rolling_sharpe_{sector.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-                        plt.tight_layout()
-                        plt.savefig(out_sharpe, dpi=200, bbox_inches='tight')
-                        plt.close()
+                        out_sharpe = self._chart_filename("rolling_sharpe", sector.replace(' ', '_'))
+                        self._save_figure(fig, out_sharpe)
                         print(f"🖼️  Saved: {out_sharpe}")
                     else:
                         print("⚠️ Not enough data for rolling Sharpe ratio calculation")
@@ -603,90 +816,161 @@ Explain WHY you picked each stock and WHY you excluded others.
         
         except Exception as e:
             print(f"❌ Error in sector portfolio analysis: {e}")
-            import traceback
-            traceback.print_exc()
+            if self.verbose:
+                import traceback
+                traceback.print_exc()
+        finally:
+            # Don't leave the warm-up or download pending past this call (close() would race them)
+            pending = [t for t in (warmup, prices_task) if t is not None]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
 
     
+    @staticmethod
+    def _prompt_run_config():
+        """Ask for the universe and date range up front; the remaining choices are prompted in context"""
+        symbols_str = input("Enter 10 stock tickers in the same sector (comma-separated, e.g., AAPL,MSFT,...): ").strip()
+        if not symbols_str:
+            symbols = list(DEFAULT_TECH_UNIVERSE)
+            print(f"Using default Technology universe: {', '.join(symbols)}")
+        else:
+            symbols = [s.strip().upper() for s in symbols_str.split(',') if s.strip()]
+        
+        start = input("Start date [YYYY-MM-DD, default 2020-01-01]: ").strip() or "2020-01-01"
+        end = input("End date [YYYY-MM-DD, default today]: ").strip() or datetime.today().strftime('%Y-%m-%d')
+        return RunConfig(symbols=symbols, start=start, end=end)
+    
+    async def run_many(self, cfgs):
+        """
+        Run several headless sector analyses concurrently.
+        Each run gets its own interface (agents and history are per-debate state) but they all
+        share this interface's Ollama client; overlap is bounded by the server's OLLAMA_NUM_PARALLEL.
+        Run k (from 1) tags its chart filenames with "runk" and prefixes its output lines with "[runk] ".
+        """
+        if self.ollama_client is None:
+            self.ollama_client = _make_ollama_client()
+        workers = [InteractiveFinancialInterface() for _ in cfgs]
+        for k, w in enumerate(workers, 1):
+            w.ollama_client = self.ollama_client
+            w.run_tag = f"run{k}"
+        
+        async def run_one(worker, cfg):
+            _output_prefix.set(f"[{worker.run_tag}] ")
+            await worker.run_sector_portfolio_analysis(cfg)
+        
+        stdout = sys.stdout
+        sys.stdout = prefixed = _PrefixedStdout(stdout)
+        try:
+            await asyncio.gather(*(run_one(w, c) for w, c in zip(workers, cfgs)))
+        finally:
+            prefixed.close()
+            sys.stdout = stdout
+    
     async def run_analysis_with_debate(self, user_prompt, stock_symbol):
         """Run analysis with agent debate and consensus building"""
         
         # Clear previous conversation
         self.conversation_history = []
+        self._running_recommendations = {'BUY': 0, 'SELL': 0, 'HOLD': 0}
+        self._agent_positions = {}
         
-        # Create the debate team - each agent speaks maximum 3 times (6 total turns for 2 agents)
+        # Create the debate team - each agent speaks maximum 3 times (6 total turns for 2 agents).
+        # The opening turn runs concurrently below, so the team handles the remaining 2 rounds.
         agent_list = list(self.agents.values())
-        debate_team = RoundRobinGroupChat(agent_list, max_turns=6)  # 3 rounds per agent
+        debate_team = RoundRobinGroupChat(agent_list, max_turns=2 * len(agent_list))
         
         # Create the analysis task
-        analysis_task = f"""Analysis Request: {user_prompt}
-
-Stock Symbol: {stock_symbol}
-
-Instructions:
-1. Each agent will speak a maximum of 3 times in total (3 rounds of discussion)
-2. In your first turn, provide your initial analysis and recommendation
-3. In subsequent turns, respond to other agents and work towards consensus
-4. Listen to other agents' perspectives and engage in constructive debate
-5. Challenge assumptions and ask probing questions
-6. Look for common ground and areas of agreement
-7. Work towards building a consensus recommendation
-8. The discussion will automatically terminate after each agent has spoken 3 times
-
-
-Please begin with your initial analyses and then engage in discussion to reach consensus."""
+        analysis_task = DEBATE_TASK_TEMPLATE.format(user_prompt=user_prompt, stock_symbol=stock_symbol)
 
         print("\n🤖 Agents are now analyzing and debating...")
         print("=" * 60)
         
         try:
-            # Stream the debate
-            stream = debate_team.run_stream(task=analysis_task)
+            # Opening analyses don't depend on each other, so both agents generate them at once
+            openings = await self._run_opening_statements(analysis_task)
+            
+            # Stream the debate; every agent already holds the task and both openings in its own
+            # context, so the team starts without a task and the openings are only replayed for display
+            stream = self._prepend_messages([TextMessage(content=analysis_task, source='user'), *openings],
+                                            debate_team.run_stream())
             
             current_speaker = None
             turn_counter = 0
+            # Chunks of the turn in progress; joined into one history entry when the speaker changes
+            turn_chunks = []
+            turn_ns = 0
+            # True while a reply is being printed token by token, until its full message arrives
+            streaming = False
             
             async for message in stream:
+                # The final TaskResult only summarizes messages already streamed
+                if isinstance(message, TaskResult):
+                    continue
+                is_chunk = isinstance(message, ModelClientStreamingChunkEvent)
+                if streaming:
+                    if is_chunk:
+                        sys.stdout.write(message.content)
+                        sys.stdout.flush()
+                        continue
+                    # The complete message for the reply just printed: record it and close the block
+                    streaming = False
+                    turn_chunks.append(message.content)
+                    self._flush_lines(["", "-" * 60])
+                    sys.stdout.flush()
+                    if self.visual_delay:
+                        await asyncio.sleep(self.visual_delay)
+                    continue
                 turn_counter += 1
                 # Extract message details
-                if hasattr(message, 'get'):
-                    sender = message.get('sender', 'Unknown')
-                    content = message.get('content', '')
-                else:
-                    # Handle different message types
-                    sender = getattr(message, 'sender', 'Unknown')
-                    content = getattr(message, 'content', str(message))
-                
-                # Store in conversation history
-                self.conversation_history.append({
-                    'timestamp': datetime.now(),
-                    'speaker': sender,
-                    'message': content
-                })
+                extract = self._msg_extractors.get(type(message))
+                if extract is None:
+                    extract = self._build_msg_extractor(message)
+                    self._msg_extractors[type(message)] = extract
+                sender, content = extract(message)
                 
-                # Display the message with proper formatting
+                # Display the message with proper formatting (one write per message)
+                lines = []
                 if sender != current_speaker:
                     if current_speaker:
-                        print()  # Add spacing between speakers
+                        self._record_turn(current_speaker, turn_chunks, turn_ns)
+                        lines.append("")  # Add spacing between speakers
+                    turn_chunks = []
+                    turn_ns = time.time_ns()
                     
                     # Determine agent type and styling
                     round_num = ((turn_counter - 1) // 3) + 1
                     turn_in_round = ((turn_counter - 1) % 3) + 1
                     
-                    if 'Wassim_Fundamental_Agent' in sender:
-                        print(f"🧮 Wassim (Fundamental Agent) - Round {round_num}, Turn {turn_in_round}:")
-                    elif 'Yugo_Valuation_Agent' in sender:
-                        print(f"📈 Yugo (Valuation Agent) - Round {round_num}, Turn {turn_in_round}:")
+                    display = self._agent_display.get(sender)
+                    if display:
+                        lines.append(f"{display[1]} - Round {round_num}, Turn {turn_in_round}:")
                     else:
-                        print(f"{sender} - Turn {turn_counter}:")
+                        lines.append(f"{sender} - Turn {turn_counter}:")
                     
                     current_speaker = sender
                 
+                if is_chunk:
+                    # First token of a streamed reply: header (if any) and the token, no newline yet
+                    streaming = True
+                    sys.stdout.write("\n".join(lines + [content]))
+                    sys.stdout.flush()
+                    continue
+                
+                turn_chunks.append(content)
+                
                 # Display message content
-                print(f"{content}")
-                print("-" * 60)
+                lines.append(f"{content}")
+                lines.append("-" * 60)
+                self._flush_lines(lines)
+                sys.stdout.flush()
                 
-                # Small delay for better visual effect
-                await asyncio.sleep(0.5)
+                # Optional delay for better visual effect
+                if self.visual_delay:
+                    await asyncio.sleep(self.visual_delay)
+            
+            if current_speaker:
+                self._record_turn(current_speaker, turn_chunks, turn_ns)
         
         except Exception as e:
             print(f"❌ Error during debate: {str(e)}")
@@ -697,6 +981,50 @@ Please begin with your initial analyses and then engage in discussion to reach c
         
         return consensus_result
     
+    def _record_turn(self, speaker, chunks, timestamp_ns):
+        """Append one finished turn to the conversation history.
+        timestamp_ns is wall-clock (time.time_ns); convert with datetime.fromtimestamp(ns / 1e9) for display."""
+        message = "\n".join(chunks)
+        self.conversation_history.append({
+            'timestamp_ns': timestamp_ns,
+            'speaker': speaker,
+            'message': message
+        })
+        position = self._classify_recommendation(message)
+        if position:
+            self._running_recommendations[position] += 1
+            self._agent_positions[speaker] = position
+    
+    async def _run_opening_statements(self, analysis_task):
+        """Run every agent's first turn concurrently and return their reply messages"""
+        agent_list = list(self.agents.values())
+        results = await asyncio.gather(*(agent.run(task=analysis_task) for agent in agent_list))
+        openings = [result.messages[-1] for result in results]
+        # Each agent's context now holds the task and its own opening as an assistant message;
+        # the other agents' openings are added as user messages, as the team would deliver them
+        for agent in agent_list:
+            for opening in openings:
+                if opening.source != agent.name:
+                    await agent.model_context.add_message(opening.to_model_message())
+        return openings
+    
+    @staticmethod
+    async def _prepend_messages(messages, stream):
+        """Yield the given messages, then everything from stream"""
+        for message in messages:
+            yield message
+        async for message in stream:
+            yield message
+    
+    @staticmethod
+    def _build_msg_extractor(message):
+        """Return a (sender, content) extractor for the type of a streamed message"""
+        if hasattr(message, 'get'):
+            return lambda m: (m.get('sender', 'Unknown'), m.get('content', ''))
+        # Handle different message types (autogen chat messages name the agent in `source`)
+        return lambda m: (getattr(m, 'source', None) or getattr(m, 'sender', 'Unknown'),
+                          getattr(m, 'content', str(m)))
+    
     def analyze_consensus(self):
         """Analyze conversation history and extract stock picks from agents"""
         
@@ -704,16 +1032,13 @@ Please begin with your initial analyses and then engage in discussion to reach c
         print("=" * 60)
         
         # Extract stock picks from conversation
-        messages = [{'content': entry['message'], 'source': entry['speaker']} 
-                   for entry in self.conversation_history]
-        
-        agent_picks = self._extract_stock_picks(messages)
+        agent_picks = self._extract_stock_picks(self.conversation_history)
         
         if not agent_picks:
             print("⚠️ No stock picks found in agent messages, falling back to simple consensus...")
             return self._fallback_consensus()
         
-        # Combine picks from both agents
+        # Combine picks from both agents (full ranking: every pick goes into the portfolio)
         ranked_stocks, stock_scores = self._combine_stock_picks(agent_picks)
         
         if not ranked_stocks:
@@ -723,23 +1048,25 @@ Please begin with your initial analyses and then engage in discussion to reach c
         # Extract just the stock symbols in ranked order
         selected_stocks = [symbol for symbol, _ in ranked_stocks]
         
+        # One result dict for both outcomes; starts out as "consensus failed"
+        result = {
+            'consensus_reached': False,
+            'selected_stocks': selected_stocks,
+            'ranked_stocks': ranked_stocks,
+            'stock_scores': stock_scores,
+            'agent_picks': agent_picks,
+            'avg_confidence': 0.0,
+            'method': 'stock_selection',
+            'conversation_length': len(self.conversation_history),
+        }
+        
         # Ensure minimum 5 stocks for portfolio construction
         MIN_STOCKS = 5
         if len(selected_stocks) < MIN_STOCKS:
             print(f"\n⚠️  Only {len(selected_stocks)} stocks selected by agents, need at least {MIN_STOCKS}")
             print(f"    Please ensure agents pick at least {MIN_STOCKS} stocks each.")
-            # Return with flag that consensus failed
-            return {
-                'consensus_reached': False,
-                'selected_stocks': selected_stocks,
-                'ranked_stocks': ranked_stocks,
-                'stock_scores': stock_scores,
-                'agent_picks': agent_picks,
-                'avg_confidence': 0.0,
-                'method': 'stock_selection',
-                'conversation_length': len(self.conversation_history),
-                'error': f'Insufficient stocks: {len(selected_stocks)} < {MIN_STOCKS}'
-            }
+            result['error'] = f'Insufficient stocks: {len(selected_stocks)} < {MIN_STOCKS}'
+            return result
         
         # Calculate average confidence (reliability removed)
         avg_confidence = sum(d['confidence'] for d in agent_picks.values()) / len(agent_picks)
@@ -748,16 +1075,9 @@ Please begin with your initial analyses and then engage in discussion to reach c
         print(f"   Selected {len(selected_stocks)} stocks from agent recommendations")
         print(f"   Average Confidence: {avg_confidence:.2f}")
         
-        return {
-            'consensus_reached': True,
-            'selected_stocks': selected_stocks,
-            'ranked_stocks': ranked_stocks,
-            'stock_scores': stock_scores,
-            'agent_picks': agent_picks,
-            'avg_confidence': avg_confidence,
-            'method': 'stock_selection',
-            'conversation_length': len(self.conversation_history)
-        }
+        result['consensus_reached'] = True
+        result['avg_confidence'] = avg_confidence
+        return result
     
     def analyze_consensus_old(self):
         """OLD METHOD: Analyze conversation history using sophisticated consensus protocol"""
@@ -769,42 +1089,26 @@ Please begin with your initial analyses and then engage in discussion to reach c
         agent_data = {}
         agent_positions = {}
         
-        for entry in self.conversation_history:
-            content = entry['message']
+        # The latest statement per agent wins, so scan newest first and stop once every agent is found
+        for entry in reversed(self.conversation_history):
             speaker = entry['speaker']
+            agent_name = self._agent_display.get(speaker, (speaker, speaker))[0]
+            if agent_name in agent_data:
+                continue
+            content = entry['message']
             
             # Look for CONSENSUS statements (OLD FORMAT)
-            if 'CONSENSUS:' in content:
+            m = _CONSENSUS_RE.search(content)
+            if m:
                 try:
-                    # Extract consensus data: direction=X confidence=Y.Z reliability=W.V
-                    consensus_line = content.split('CONSENSUS:')[1].strip().split('\n')[0]
-                    
-                    # Parse direction
-                    if 'direction=-1' in consensus_line:
-                        direction = -1
-                    elif 'direction=0' in consensus_line:
-                        direction = 0
-                    elif 'direction=1' in consensus_line or 'direction=+1' in consensus_line:
-                        direction = 1
-                    else:
+                    direction = int(m[1])
+                    position = _DIRECTION_LABELS.get(direction)
+                    if position is None:
                         continue
-                    
-                    # Parse confidence
-                    confidence_start = consensus_line.find('confidence=') + 11
-                    confidence_end = consensus_line.find(' ', confidence_start)
-                    if confidence_end == -1:
-                        confidence_end = len(consensus_line)
-                    confidence = float(consensus_line[confidence_start:confidence_end])
-                    
-                    # Parse reliability
-                    reliability_start = consensus_line.find('reliability=') + 12
-                    reliability_end = consensus_line.find(' ', reliability_start)
-                    if reliability_end == -1:
-                        reliability_end = len(consensus_line)
-                    reliability = float(consensus_line[reliability_start:reliability_end])
+                    confidence = float(m[2])
+                    reliability = float(m[3])
                     
                     # Store agent data
-                    agent_name = 'Wassim' if 'Wassim' in speaker else 'Yugo'
                     agent_data[agent_name] = {
                         'direction': direction,
                         'confidence': confidence,
@@ -812,16 +1116,15 @@ Please begin with your initial analyses and then engage in discussion to reach c
                     }
                     
                     # Map to string for compatibility
-                    if direction == 1:
-                        agent_positions[speaker] = 'BUY'
-                    elif direction == -1:
-                        agent_positions[speaker] = 'SELL'
-                    else:
-                        agent_positions[speaker] = 'HOLD'
+                    agent_positions[speaker] = position
                         
-                except (ValueError, IndexError) as e:
+                except ValueError as e:
                     print(f"⚠️ Could not parse consensus from {speaker}: {e}")
                     continue
+            
+            if len(agent_data) == len(self._agent_display):
+                break
+        agent_data = self._in_speaking_order(agent_data)
         
         # If no structured data found, fall back to simple counting
         if not agent_data:
@@ -837,16 +1140,9 @@ Please begin with your initial analyses and then engage in discussion to reach c
                 consensus_reached = True
                 print(f"\n🏁 Final Decision: {decision} (Unanimous High-Confidence Neutrality)")
             else:
-                if not process_3_min_conf(agent_data):
-                    print("\n🔄 Debate continues (Low confidence).")
-                    consensus_reached = False
-                    decision = "HOLD"
-                elif not process_4_conflict(agent_data):
-                    print("\n🔄 Debate continues (Strong conflict).")
-                    consensus_reached = False
-                    decision = "HOLD"
-                elif not process_5_vibe(agent_data):
-                    print("\n🔄 Debate continues (Weak overall alignment).")
+                failed = next((reason for gate, reason in _CONSENSUS_GATES if not gate(agent_data)), None)
+                if failed:
+                    print(f"\n🔄 Debate continues ({failed}).")
                     consensus_reached = False
                     decision = "HOLD"
                 else:
@@ -854,23 +1150,12 @@ Please begin with your initial analyses and then engage in discussion to reach c
                     consensus_reached = True
                     process_7_summary(agent_data, decision, total_value, p_val)
             
-            # Convert to string format for compatibility
-            if decision == "BUY":
-                final_recommendation = "BUY"
-            elif decision == "SELL":
-                final_recommendation = "SELL"
-            else:
-                final_recommendation = "HOLD"
+            # process_6_value only ever returns BUY/SELL/HOLD
+            final_recommendation = decision
             
             # Build recommendations dict for compatibility
-            recommendations = {'BUY': 0, 'SELL': 0, 'HOLD': 0}
-            for agent_name, data in agent_data.items():
-                if data['direction'] == 1:
-                    recommendations['BUY'] += 1
-                elif data['direction'] == -1:
-                    recommendations['SELL'] += 1
-                else:
-                    recommendations['HOLD'] += 1
+            votes = Counter(_DIRECTION_LABELS[data['direction']] for data in agent_data.values())
+            recommendations = {label: votes[label] for label in ('BUY', 'SELL', 'HOLD')}
             
             return {
                 'consensus_reached': consensus_reached,
@@ -887,67 +1172,66 @@ Please begin with your initial analyses and then engage in discussion to reach c
             print("🔄 Falling back to simple consensus...")
             return self._fallback_consensus()
     
-    def _extract_stock_picks(self, messages):
-        """Extract stock picks from agent messages"""
-        import re
+    def _extract_stock_picks(self, history):
+        """Extract stock picks from conversation history entries"""
         
         agent_picks = {}
         
-        for msg in messages:
-            content = msg.content if hasattr(msg, 'content') else str(msg)
-            speaker = msg.source if hasattr(msg, 'source') else 'Unknown'
+        # Only each agent's latest valid picks count, so scan newest first and stop once all are found
+        for entry in reversed(history):
+            speaker = entry['speaker']
+            agent_name = self._agent_display.get(speaker, (speaker, speaker))[0]
+            if agent_name in agent_picks:
+                continue
+            content = entry['message']
             
-            # Look for MY PICKS: [SYMBOL1, SYMBOL2, ...]
-            if 'MY PICKS:' in content.upper():
+            # Look for MY PICKS: [SYMBOL1, SYMBOL2, ...] - with brackets, else without
+            picks_match = _PICKS_RE.search(content) or _PICKS_BARE_RE.search(content)
+            if picks_match:
                 try:
-                    # Extract the stock list - try both with and without brackets
-                    picks_match = re.search(r'MY PICKS:\s*\[([^\]]+)\]', content, re.IGNORECASE)
-                    if not picks_match:
-                        # Try without brackets
-                        picks_match = re.search(r'MY PICKS:\s*([A-Z, ]+)', content, re.IGNORECASE)
-                    if picks_match:
-                        picks_str = picks_match.group(1)
-                        # Clean and split the symbols
-                        symbols = [s.strip().upper() for s in picks_str.split(',')]
-                        symbols = [s for s in symbols if s and len(s) <= 5]  # Remove empty and placeholders
-                        
-                        # Filter out placeholder symbols like SYMBOL1, SYMBOL2, etc.
-                        symbols = [s for s in symbols if not s.startswith('SYMBOL') and s != '...']
-                        
-                        # Skip if no valid symbols
-                        if not symbols:
-                            continue
-                        
-                        # Extract confidence - try multiple patterns
-                        confidence = 0.5  # default
-                        conf_patterns = [
-                            r'CONFIDENCE:\s*([\d\.]+)',
-                            r'CONFIDENCE\s*([\d\.]+)',
-                            r'confidence:\s*([\d\.]+)',
-                            r'confidence\s*([\d\.]+)'
-                        ]
-                        for pattern in conf_patterns:
-                            conf_match = re.search(pattern, content, re.IGNORECASE)
-                            if conf_match:
-                                confidence = float(conf_match.group(1))
-                                break
-                        
-                        # Only store if confidence > 0 (skip placeholder examples)
-                        if confidence > 0:
-                            # Store agent picks (keep the latest valid one per agent)
-                            agent_name = 'Wassim' if 'Wassim' in speaker else 'Yugo'
-                            agent_picks[agent_name] = {
-                                'picks': symbols,
-                                'confidence': confidence
-                            }
-                            
-                            print(f"\n📋 {agent_name}'s Picks: {symbols}")
-                            print(f"   Confidence: {confidence:.2f}")
+                    # Clean and split the symbols in one pass, dropping empties, overlong
+                    # tokens and placeholders like SYMBOL1 or ...
+                    symbols = []
+                    for tok in picks_match.group(1).split(','):
+                        sym = tok.strip().upper()
+                        if sym and len(sym) <= 5 and not sym.startswith('SYMBOL') and sym != '...':
+                            symbols.append(sym)
+                    
+                    # Skip if no valid symbols
+                    if not symbols:
+                        continue
+                    
+                    # Extract confidence
+                    confidence = 0.5  # default
+                    for conf_re in _CONFIDENCE_RES:
+                        conf_match = conf_re.search(content)
+                        if conf_match:
+                            confidence = float(conf_match.group(1))
+                            break
+                    
+                    # Only store if confidence > 0 (skip placeholder examples)
+                    if confidence > 0:
+                        agent_picks[agent_name] = {
+                            'picks': symbols,
+                            'confidence': confidence
+                        }
                         
+                        print(f"\n📋 {agent_name}'s Picks: {symbols}")
+                        print(f"   Confidence: {confidence:.2f}")
+                    
                 except Exception as e:
                     print(f"⚠️ Error parsing picks from {speaker}: {e}")
+            
+            if len(agent_picks) == len(self._agent_display):
+                break
         
-        return agent_picks
+        # Report (and rank) agents in speaking order
+        return self._in_speaking_order(agent_picks)
+    
+    def _in_speaking_order(self, by_agent):
+        """Reorder a dict keyed by short agent name to speaking order (unknown names last)"""
+        rank = self._agent_rank
+        return dict(sorted(by_agent.items(), key=lambda kv: rank.get(kv[0], len(rank))))
     
     def _combine_stock_picks(self, agent_picks):
         """Combine stock picks from multiple agents with weighted scoring"""
@@ -961,61 +1245,36 @@ Please begin with your initial analyses and then engage in discussion to reach c
             # Use confidence only (reliability removed)
             weight = data.get('confidence', 0.5)
             for symbol in data['picks']:
-                if symbol not in stock_scores:
-                    stock_scores[symbol] = {
+                # One dict lookup per pick; the tally entry is created on first sight
+                entry = stock_scores.get(symbol)
+                if entry is None:
+                    entry = stock_scores[symbol] = {
                         'agents': [],
                         'total_weight': 0.0,
                         'count': 0
                     }
-                stock_scores[symbol]['agents'].append(agent_name)
-                stock_scores[symbol]['total_weight'] += weight
-                stock_scores[symbol]['count'] += 1
-        
-        # Sort by total weight (confidence * reliability sum)
-        ranked_stocks = sorted(
-            stock_scores.items(),
-            key=lambda x: (x[1]['count'], x[1]['total_weight']),  # Sort by count first, then weight
-            reverse=True
-        )
+                entry['agents'].append(agent_name)
+                entry['total_weight'] += weight
+                entry['count'] += 1
         
-        print("\n" + "=" * 80)
-        print("📊 CONSENSUS STOCK RANKING")
-        print("=" * 80)
+        # Sort by count first, then total weight (confidence sum)
+        ranked_stocks = sorted(stock_scores.items(),
+                               key=lambda x: (x[1]['count'], x[1]['total_weight']), reverse=True)
         
+        lines = ["\n" + "=" * 80, "📊 CONSENSUS STOCK RANKING", "=" * 80]
         for symbol, data in ranked_stocks:
             consensus_level = "🟢 STRONG" if data['count'] >= 2 else "⚪ MODERATE"
             agents_str = " & ".join(data['agents'])
-            print(f"{consensus_level} | {symbol:6} | Picked by: {agents_str:20} | Score: {data['total_weight']:.2f}")
-        
-        print("=" * 80)
+            lines.append(f"{consensus_level} | {symbol:6} | Picked by: {agents_str:20} | Score: {data['total_weight']:.2f}")
+        lines.append("=" * 80)
+        self._flush_lines(lines)
         
         return ranked_stocks, stock_scores
     
     def _fallback_consensus(self):
-        """Fallback to simple consensus counting"""
-        recommendations = {'BUY': 0, 'SELL': 0, 'HOLD': 0}
-        agent_positions = {}
-        
-        for entry in self.conversation_history:
-            content = entry['message'].upper()
-            speaker = entry['speaker']
-            
-            # Count explicit recommendations
-            if 'RECOMMEND BUY' in content or 'RECOMMENDATION: BUY' in content:
-                recommendations['BUY'] += 1
-                agent_positions[speaker] = 'BUY'
-            elif 'RECOMMEND SELL' in content or 'RECOMMENDATION: SELL' in content:
-                recommendations['SELL'] += 1
-                agent_positions[speaker] = 'SELL'
-            elif 'RECOMMEND HOLD' in content or 'RECOMMENDATION: HOLD' in content:
-                recommendations['HOLD'] += 1
-                agent_positions[speaker] = 'HOLD'
-            elif 'BUY' in content and 'SELL' not in content and 'DEBATE' not in content:
-                recommendations['BUY'] += 1
-                agent_positions[speaker] = 'BUY'
-            elif 'SELL' in content and 'DEBATE' not in content:
-                recommendations['SELL'] += 1
-                agent_positions[speaker] = 'SELL'
+        """Fallback to simple consensus counting over the tallies kept by _record_turn"""
+        recommendations = dict(self._running_recommendations)
+        agent_positions = dict(self._agent_positions)
         
         # Determine consensus
         max_rec = max(recommendations, key=recommendations.get)
@@ -1032,13 +1291,42 @@ Please begin with your initial analyses and then engage in discussion to reach c
             'sophisticated_consensus': False
         }
     
+    @staticmethod
+    def _classify_recommendation(content):
+        """BUY/SELL/HOLD for a message, or None. Explicit recommendations win
+        (BUY, then SELL, then HOLD); otherwise a bare BUY or SELL counts unless the message is debating."""
+        explicit = set()
+        seen = set()
+        for m in _RECOMMENDATION_RE.finditer(content):
+            if m[1]:
+                label = m[1].upper()
+                if label == 'BUY':
+                    return 'BUY'  # highest priority, nothing later can override it
+                explicit.add(label)
+                seen.add(label)
+            else:
+                seen.add(m[2].upper())
+        for label in ('BUY', 'SELL', 'HOLD'):
+            if label in explicit:
+                return label
+        if 'DEBATE' in seen:
+            return None
+        if 'BUY' in seen and 'SELL' not in seen:
+            return 'BUY'
+        if 'SELL' in seen:
+            return 'SELL'
+        return None
+    
+    def _chart_filename(self, *parts):
+        """PNG filename from parts, the run tag (if any) and the current timestamp"""
+        tag = [self.run_tag] if self.run_tag else []
+        return "_".join([*parts, *tag, datetime.now().strftime('%Y%m%d_%H%M%S')]) + ".png"
+    
     def _save_comparison_charts(self, res_oos, res_in, sector, strategy):
         """Save side-by-side comparison charts of OOS vs In-Sample"""
         try:
-            import matplotlib.pyplot as plt
-            import numpy as np
-            
-            fig, axes = plt.subplots(2, 1, figsize=(14, 10))
+            fig = Figure(figsize=(14, 10))
+            axes = fig.subplots(2, 1)
             
             # Equity curves comparison
             ax1 = axes[0]
@@ -1063,14 +1351,13 @@ Please begin with your initial analyses and then engage in discussion to reach c
             ax2.legend()
             ax2.grid(alpha=0.3)
             
-            plt.tight_layout()
-            out = f"comparison_OOS_vs_InSample_{sector.replace(' ', '_')}_{strategy}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-            plt.savefig(out, dpi=200, bbox_inches='tight')
-            plt.close()
+            out = self._chart_filename("comparison_OOS_vs_InSample", sector.replace(' ', '_'), strategy)
+            self._save_figure(fig, out)
             print(f"\n🖼️  Saved comparison chart: {out}")
             
             # Performance metrics bar chart
-            fig, ax = plt.subplots(1, 1, figsize=(12, 6))
+            fig = Figure(figsize=(12, 6))
+            ax = fig.subplots(1, 1)
             metrics = ['CAGR', 'Sharpe', 'Vol', 'MaxDD']
             oos_vals = [res_oos.metrics.get(m, 0) for m in metrics]
             in_vals = [res_in.metrics.get(m, 0) for m in metrics]
@@ -1090,70 +1377,77 @@ Please begin with your initial analyses and then engage in discussion to reach c
             ax.grid(alpha=0.3, axis='y')
             ax.axhline(y=0, color='black', linewidth=0.8)
             
-            plt.tight_layout()
-            out_bar = f"metrics_comparison_{sector.replace(' ', '_')}_{strategy}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-            plt.savefig(out_bar, dpi=200, bbox_inches='tight')
-            plt.close()
+            out_bar = self._chart_filename("metrics_comparison", sector.replace(' ', '_'), strategy)
+            self._save_figure(fig, out_bar)
             print(f"🖼️  Saved metrics comparison: {out_bar}")
             
         except Exception as e:
             print(f"⚠️ Could not save comparison charts: {e}")
-            import traceback
-            traceback.print_exc()
+            if self.verbose:
+                import traceback
+                traceback.print_exc()
     
     def display_final_results(self, result):
         """Display final analysis results"""
         
-        print("\n🎉 ANALYSIS COMPLETE!")
-        print("=" * 60)
+        lines = ["\n🎉 ANALYSIS COMPLETE!", "=" * 60]
         
         if result.get('method') == 'stock_selection':
             # New stock selection format
             selected_stocks = result.get('selected_stocks', [])
-            print(f"Selected Stocks: {len(selected_stocks)}")
-            print(f"Consensus Reached: {'Yes' if result['consensus_reached'] else 'No'}")
-            print(f"Selection Method: Agent Stock Picks")
-            print(f"Conversation Length: {result['conversation_length']} messages")
+            lines.append(f"Selected Stocks: {len(selected_stocks)}")
+            lines.append(f"Consensus Reached: {'Yes' if result['consensus_reached'] else 'No'}")
+            lines.append("Selection Method: Agent Stock Picks")
+            lines.append(f"Conversation Length: {result['conversation_length']} messages")
             
-            print(f"\n📋 Stock Selections:")
+            lines.append("\n📋 Stock Selections:")
             agent_picks = result.get('agent_picks', {})
             for agent_name, data in agent_picks.items():
                 picks_str = ", ".join(data['picks'])
-                print(f"  {agent_name}: {picks_str}")
-                print(f"    (Confidence: {data['confidence']:.2f})")
+                lines.append(f"  {agent_name}: {picks_str}")
+                lines.append(f"    (Confidence: {data['confidence']:.2f})")
         else:
             # Old BUY/HOLD/SELL format (fallback)
-            print(f"Final Recommendation: {result.get('final_recommendation', 'N/A')}")
-            print(f"Consensus Reached: {'Yes' if result['consensus_reached'] else 'No'}")
-            print(f"Consensus Method: {'Sophisticated Protocol' if result.get('sophisticated_consensus', False) else 'Simple Counting'}")
-            print(f"Conversation Length: {result['conversation_length']} messages")
+            lines.append(f"Final Recommendation: {result.get('final_recommendation', 'N/A')}")
+            lines.append(f"Consensus Reached: {'Yes' if result['consensus_reached'] else 'No'}")
+            lines.append(f"Consensus Method: {'Sophisticated Protocol' if result.get('sophisticated_consensus', False) else 'Simple Counting'}")
+            lines.append(f"Conversation Length: {result['conversation_length']} messages")
             
             if 'recommendations' in result:
-                print(f"\n📈 Recommendation Breakdown:")
+                lines.append("\n📈 Recommendation Breakdown:")
                 for rec, count in result['recommendations'].items():
                     if count > 0:
-                        print(f"  {rec}: {count}")
+                        lines.append(f"  {rec}: {count}")
             
             if 'agent_positions' in result:
-                print(f"\n👥 Individual Agent Positions:")
+                lines.append("\n👥 Individual Agent Positions:")
                 for agent, position in result['agent_positions'].items():
-                    if 'Wassim_Fundamental_Agent' in agent:
-                        agent_name = "Wassim (Fundamental Agent)"
-                    elif 'Yugo_Valuation_Agent' in agent:
-                        agent_name = "Yugo (Valuation Agent)"
-                    else:
-                        agent_name = agent
-                    print(f"  {agent_name}: {position}")
+                    agent_name = self._agent_display.get(agent, (agent, agent))[1]
+                    lines.append(f"  {agent_name}: {position}")
         
         # Show conversation summary
-        print(f"\n💬 Conversation Summary:")
-        print(f"  Total messages: {len(self.conversation_history)}")
-        print(f"  Analysis completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        lines.append("\n💬 Conversation Summary:")
+        lines.append(f"  Total messages: {len(self.conversation_history)}")
+        lines.append(f"  Analysis completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        self._flush_lines(lines)
+    
+    @staticmethod
+    def _save_figure(fig, path):
+        """Lay out and write a figure to PNG (150 dpi is plenty for on-screen viewing)"""
+        fig.tight_layout()
+        fig.savefig(path, dpi=150, bbox_inches='tight')
+    
+    @staticmethod
+    def _flush_lines(lines):
+        """Write a block of output lines to stdout in a single call"""
+        sys.stdout.write("\n".join(lines) + "\n")
     
     async def close(self):
         """Close the Ollama client"""
         if self.ollama_client:
             await self.ollama_client.close()
+            self.ollama_client = None
+            self.agents = {}
 
 
 
@@ -7,26 +7,106 @@ Outputs a concise table: variable, p_value, direction, strength.
 
 from __future__ import annotations
 
+import csv
+from functools import lru_cache
+from itertools import islice
+
 import numpy as np
 import pandas as pd
 from typing import Optional, List
-from statsmodels.tsa.api import VAR
 
 
 REQUIRED_COLS = ['CPI', 'Unemployment', '10Y_Treasury', 'FedFundsRate', 'IP_Index']
 
 
+@lru_cache(maxsize=32)
+def _detect_date_column_static(cols: tuple) -> str:
+    """First column whose name looks like a date, else the first column. Cached per header."""
+    date_keywords = ('date', 'time', 'timestamp', 'month', 'year', 'period')
+    for col, lowered in zip(cols, tuple(c.lower() for c in cols)):
+        if any(k in lowered for k in date_keywords):
+            return col
+    return cols[0]
+
+
+def _select_var_order(values: np.ndarray, maxlags: int) -> dict:
+    """
+    Lag order chosen by each information criterion for a VAR with a constant, matching
+    VAR.select_order(maxlags) (same common sample of T - maxlags rows for every lag, same
+    AIC/BIC/HQIC/FPE formulas). Every lag is a plain least-squares solve on a slice of one
+    pre-built lagged design matrix, so no VARResults objects are created.
+    """
+    T, k = values.shape
+    nobs = T - maxlags
+    y = values[maxlags:]
+    # Columns: constant, then y_{t-1}, ..., y_{t-maxlags}
+    design = np.ones((nobs, 1 + k * maxlags))
+    for j in range(1, maxlags + 1):
+        design[:, 1 + k * (j - 1):1 + k * j] = values[maxlags - j:T - j]
+
+    ics = {'aic': [], 'bic': [], 'hqic': [], 'fpe': []}
+    for p in range(0, maxlags + 1):
+        X = design[:, :1 + k * p]
+        coef, *_ = np.linalg.lstsq(X, y, rcond=None)
+        resid = y - X @ coef
+        df_model = 1 + k * p
+        df_resid = nobs - df_model
+        free_params = p * k ** 2 + k
+        if df_resid:
+            chol = np.linalg.cholesky(resid.T @ resid / nobs)
+            ld = 2 * np.log(np.diag(chol)).sum()
+            fpe = ((nobs + df_model) / df_resid) ** k * np.exp(ld)
+        else:
+            ld = -np.inf
+            fpe = np.inf
+        ics['aic'].append(ld + (2.0 / nobs) * free_params)
+        ics['bic'].append(ld + (np.log(nobs) / nobs) * free_params)
+        ics['hqic'].append(ld + (2.0 * np.log(np.log(nobs)) / nobs) * free_params)
+        ics['fpe'].append(fpe)
+    return {name: int(np.argmin(v)) for name, v in ics.items()}
+
+
+def _granger_f_pvalues(res, caused: str, causing: List[str]) -> List[float]:
+    """
+    F-test p-values for "each causing variable Granger-causes `caused`", one per variable.
+    Same Wald statistic as VARResults.test_causality(caused, [var], kind='f'), but the
+    coefficient vector and its covariance are built once and each test only slices them.
+    """
+    from scipy import stats
+
+    k, p = res.neqs, res.k_ar
+    names = list(res.names)
+    ed = names.index(caused)
+    cols_det = k * res.k_exog
+    b = np.asarray(res.params).T.ravel(order='F')  # vec(params.T)
+    cov = np.asarray(res.cov_params())
+    df_denom = k * res.df_resid
+
+    pvals = []
+    for var in causing:
+        ing = names.index(var)
+        idx = [cols_det + ed + k * ing + k ** 2 * j for j in range(p)]
+        cb = b[idx]
+        stat = cb @ np.linalg.solve(cov[np.ix_(idx, idx)], cb) / p
+        pvals.append(float(stats.f.sf(stat, p, df_denom)))
+    return pvals
+
+
 class MacroVARAnalyzer:
     def __init__(self):
         self.macro_df: Optional[pd.DataFrame] = None
         self.date_column: Optional[str] = None
+        # (macro_df it was built from, index, values), reused across analyze() calls
+        self._macro_cache: Optional[tuple] = None
 
     def load_macro_csv(self, file_path: str, date_column: Optional[str] = None) -> bool:
         try:
-            try:
-                df = pd.read_csv(file_path)
-            except Exception:
-                df = pd.read_csv(file_path, skiprows=1)
+            # A title line above the header has fewer fields than the header; skip it
+            # instead of letting a first full parse fail and re-reading the file.
+            with open(file_path, 'r', newline='') as f:
+                head = list(islice(csv.reader(f), 2))
+            skiprows = 1 if len(head) == 2 and len(head[0]) < len(head[1]) else 0
+            df = pd.read_csv(file_path, skiprows=skiprows)
 
             if date_column is None:
                 date_column = self._detect_date_column(df)
@@ -35,32 +115,35 @@ class MacroVARAnalyzer:
             df = df.dropna(subset=[date_column])
             df = df.sort_values(by=date_column).set_index(date_column)
 
-            # Normalize column names to match REQUIRED_COLS case-insensitively
-            colmap = {c: c for c in df.columns}
-            for req in REQUIRED_COLS:
-                for c in df.columns:
-                    if c.lower() == req.lower():
-                        colmap[c] = req
-                        break
-            df = df.rename(columns=colmap)
+            # Normalize column names to match REQUIRED_COLS case-insensitively (first match wins)
+            lower_map = {}
+            for c in df.columns:
+                lower_map.setdefault(c.lower(), c)
+            colmap = {lower_map[req.lower()]: req for req in REQUIRED_COLS
+                      if req.lower() in lower_map and lower_map[req.lower()] != req}
+            if colmap:
+                df = df.rename(columns=colmap)
 
-            missing = [c for c in REQUIRED_COLS if c not in df.columns]
+            missing = [c for c in REQUIRED_COLS if c.lower() not in lower_map]
             if missing:
                 raise ValueError(f"Missing required macro columns: {missing}")
 
-            self.macro_df = df[REQUIRED_COLS].astype(float)
+            # float32 storage is ample for macro levels; analyze() promotes to float64 for the VAR
+            self.macro_df = df[REQUIRED_COLS].astype(np.float32)
             self.date_column = date_column
             return True
         except Exception as e:
             print(f"❌ Error loading macro CSV: {e}")
             return False
 
+    def _macro_arrays(self):
+        """Index and values (in macro_df's own dtype) of macro_df, rebuilt only when macro_df is replaced."""
+        if self._macro_cache is None or self._macro_cache[0] is not self.macro_df:
+            self._macro_cache = (self.macro_df, self.macro_df.index, self.macro_df.to_numpy())
+        return self._macro_cache[1], self._macro_cache[2]
+
     def _detect_date_column(self, df: pd.DataFrame) -> str:
-        date_keywords = ['date', 'time', 'timestamp', 'month', 'year', 'period']
-        for col in df.columns:
-            if any(k in col.lower() for k in date_keywords):
-                return col
-        return df.columns[0]
+        return _detect_date_column_static(tuple(df.columns))
 
     def analyze(self, returns: pd.Series, maxlags: int = 6) -> pd.DataFrame:
         """
@@ -68,53 +151,95 @@ class MacroVARAnalyzer:
         and test Granger causality of each macro variable on returns.
         Strength is |corr(returns, macro_lag1)| and direction is sign of that corr.
         """
+        try:
+            from statsmodels.tsa.api import VAR
+        except ImportError as e:
+            raise ImportError("statsmodels is required. Install with `pip install statsmodels`.") from e
+
         if self.macro_df is None:
             raise ValueError("Macro data not loaded")
 
-        # Ensure index is datetime and align
-        r = returns.copy()
-        r.index = pd.to_datetime(r.index)
-        df = pd.concat([r.rename('returns'), self.macro_df], axis=1).dropna()
+        # Ensure index is datetime and align on the macro dates where both sides are present
+        if not isinstance(returns.index, pd.DatetimeIndex):
+            returns = returns.copy()
+            returns.index = pd.to_datetime(returns.index)
+        macro_index, macro_values = self._macro_arrays()
+        r = returns.reindex(macro_index).to_numpy(dtype=float)
+        keep = ~np.isnan(r) & ~np.isnan(macro_values).any(axis=1)
+        df = pd.DataFrame(np.column_stack([r[keep], macro_values[keep]]),
+                          index=macro_index[keep], columns=['returns'] + REQUIRED_COLS)
 
         # Fit VAR with automatic lag selection up to maxlags
+        # (too few rows to fit the maxlags model falls straight back to a single lag)
         model = VAR(df)
-        try:
-            sel = model.select_order(maxlags=maxlags)
-            k_ar = int(sel.aic or sel.fpe or sel.hqic or sel.bic)
-            if k_ar <= 0:
-                k_ar = 1
-        except Exception:
+        if len(df) - maxlags <= 1 + df.shape[1] * maxlags:
             k_ar = 1
-
-        res = model.fit(k_ar)
-
-        rows = []
-        for var in REQUIRED_COLS:
+        else:
             try:
-                test = res.test_causality('returns', [var], kind='f')
-                pval = float(test.pvalue)
-            except Exception:
-                pval = np.nan
-
-            # Direction/strength via lag-1 correlation
-            macro_lag = df[var].shift(1)
-            aligned = pd.concat([df['returns'], macro_lag], axis=1).dropna()
-            if len(aligned) > 2:
-                corr = aligned.corr().iloc[0, 1]
-            else:
-                corr = np.nan
+                sel = _select_var_order(df.to_numpy(dtype=float), maxlags)
+                k_ar = max(1, int(sel['aic'])) if sel['aic'] is not None else 1
+            except np.linalg.LinAlgError:
+                # Singular / rank-deficient panel: statsmodels would fail the same way
+                k_ar = 1
 
-            direction = 'pos' if pd.notna(corr) and corr >= 0 else 'neg'
-            strength = float(abs(corr)) if pd.notna(corr) else np.nan
+        res = model.fit(k_ar)
 
-            rows.append({'variable': var, 'p_value': pval, 'direction': direction, 'strength': strength})
+        # Direction/strength via lag-1 correlation. df has no NaNs, so pairing returns[t] with
+        # macro[t-1] drops only the first row for every variable: one correlation matrix covers all.
+        if len(df) > 3:
+            vals = df[['returns'] + REQUIRED_COLS].to_numpy(dtype=float)
+            lagged = np.column_stack([vals[1:, 0], vals[:-1, 1:]])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                lag1_corr = np.corrcoef(lagged, rowvar=False)[0, 1:]
+        else:
+            lag1_corr = np.full(len(REQUIRED_COLS), np.nan)
 
-        table = pd.DataFrame(rows).sort_values(by='p_value', na_position='last')
-        return table
+        try:
+            pvals = _granger_f_pvalues(res, 'returns', REQUIRED_COLS)
+        except Exception:
+            pvals = []
+            for var in REQUIRED_COLS:
+                try:
+                    test = res.test_causality('returns', [var], kind='f')
+                    pvals.append(float(test.pvalue))
+                except Exception:
+                    pvals.append(np.nan)
+
+        # Build the table column-wise; NaN correlations read as 'neg' with NaN strength
+        pvals = np.asarray(pvals, dtype=float)
+        directions = np.where(lag1_corr >= 0, 'pos', 'neg')
+        strengths = np.abs(lag1_corr)
+        table = pd.DataFrame({'variable': REQUIRED_COLS, 'p_value': pvals,
+                              'direction': directions, 'strength': strengths})
+        # argsort puts NaN p-values last
+        return table.iloc[np.argsort(pvals, kind='stable')]
 
     @staticmethod
     def format_table(table: pd.DataFrame) -> str:
-        # concise string table
-        return table.to_string(index=False, float_format=lambda x: f"{x:.4f}")
+        # concise string table, laid out like table.to_string(index=False, float_format='{:.4f}')
+        # but with float cells formatted in one vectorized call per column; any other column must
+        # hold only strings (no missing values, no numbers in object columns) to take this path
+        if table.empty or not all(
+            table[name].dtype.kind == 'f'
+            or (not table[name].hasnans and pd.api.types.infer_dtype(table[name], skipna=False) == 'string')
+            for name in table.columns
+        ):
+            return table.to_string(index=False, float_format=lambda x: f"{x:.4f}")
+
+        columns = []
+        for name in table.columns:
+            col = table[name]
+            header = str(name)
+            if col.dtype.kind == 'f':
+                arr = col.to_numpy()
+                cells = np.char.mod('%.4f', arr)
+                cells[np.isnan(arr)] = 'NaN'
+                # pandas reserves a sign column in front of float headers
+                width = max(len(header) + 1, max(len(c) for c in cells))
+            else:
+                cells = col.astype(str).tolist()
+                width = max(len(header), max(len(c) for c in cells))
+            columns.append([header.rjust(width)] + [c.rjust(width) for c in cells])
+        return "\n".join(" ".join(row) for row in zip(*columns))
 
 
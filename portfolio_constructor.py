@@ -4,6 +4,7 @@ Portfolio construction utilities: equal-weight and inverse-volatility weighting.
 
 from __future__ import annotations
 
+import warnings
 from typing import Optional
 
 import numpy as np
@@ -16,15 +17,30 @@ def equal_weight_weights(tickers: list[str]) -> pd.Series:
     return pd.Series(w, index=tickers)
 
 
+def _nanstd(values: np.ndarray) -> np.ndarray:
+    """Column-wise population std ignoring NaNs (NaN for an all-NaN or infinite column)."""
+    try:
+        import bottleneck as bn
+        return bn.nanstd(values, axis=0)
+    except ImportError:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return np.nanstd(values, axis=0)
+
+
 def inverse_vol_weights(price_df: pd.DataFrame, lookback_days: int = 63, min_weight: float = 0.0) -> pd.Series:
-    ret = price_df.sort_index().pct_change().dropna(how="all")
-    recent = ret.iloc[-lookback_days:]
-    vol = recent.std(ddof=0)
-    inv_vol = 1.0 / vol.replace(0.0, np.nan)
-    inv_vol = inv_vol.replace([np.inf, -np.inf], np.nan).fillna(0.0)
+    # Gaps are forward-filled before taking returns, as pct_change() does by default on pandas 2
+    P = price_df.sort_index().ffill().to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ret = P[1:] / P[:-1] - 1.0
+    ret = ret[~np.isnan(ret).all(axis=1)]
+    vol = _nanstd(ret[-lookback_days:])
+    with np.errstate(divide='ignore'):
+        inv_vol = 1.0 / vol
+    inv_vol[~np.isfinite(inv_vol)] = 0.0
     if inv_vol.sum() == 0:
         return equal_weight_weights(list(price_df.columns))
-    w = inv_vol / inv_vol.sum()
+    w = pd.Series(inv_vol / inv_vol.sum(), index=price_df.columns)
     if min_weight > 0:
         w = w.clip(lower=min_weight)
         w = w / w.sum()
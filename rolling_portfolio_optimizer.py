@@ -10,6 +10,8 @@ This avoids look-ahead bias and provides realistic performance estimates.
 """
 
 from __future__ import annotations
+import sys
+from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Tuple
 import numpy as np
 import pandas as pd
@@ -27,6 +29,41 @@ from optimizer_mpt import (
 from portfolio_constructor import inverse_vol_weights, equal_weight_weights
 
 
+@dataclass
+class RollingCovState:
+    """
+    Running sums for the population covariance of a sliding block of rows of `values`.
+    Consecutive rebalances share most of their window, so moving from [lo, hi) to a later
+    window only adds the new rows and subtracts the dropped ones. `values` must be NaN-free.
+    """
+    values: np.ndarray
+    lo: int = 0
+    hi: int = 0
+    sum_x: Optional[np.ndarray] = field(default=None, repr=False)
+    sum_xx: Optional[np.ndarray] = field(default=None, repr=False)
+
+    def covariance(self, lo: int, hi: int) -> np.ndarray:
+        """Covariance (ddof=0) of values[lo:hi]."""
+        if self.sum_x is None or lo < self.lo or hi < self.hi or lo >= self.hi:
+            # First call, window moved backwards or no overlap: sum the block from scratch
+            block = self.values[lo:hi]
+            self.sum_x = block.sum(axis=0)
+            self.sum_xx = block.T @ block
+        else:
+            new, dropped = self.values[self.hi:hi], self.values[self.lo:lo]
+            self.sum_x += new.sum(axis=0) - dropped.sum(axis=0)
+            self.sum_xx += new.T @ new - dropped.T @ dropped
+        self.lo, self.hi = lo, hi
+        n = hi - lo
+        mean = self.sum_x / n
+        return self.sum_xx / n - np.outer(mean, mean)
+
+
+def _write_lines(lines: List[str]) -> None:
+    """Write a block of progress lines to stdout in a single call"""
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
 def get_rebalancing_dates(index: pd.DatetimeIndex, frequency: str = "M") -> pd.DatetimeIndex:
     """
     Get rebalancing dates from a datetime index based on frequency.
@@ -98,20 +135,49 @@ def rolling_optimize_weights(
         raise ValueError(f"No rebalancing dates found with min_train_days={min_train_days}")
     
     if verbose:
-        print(f"\n🔄 Rolling Optimization (OUT-OF-SAMPLE)")
-        print(f"   Strategy: {strategy.upper()}")
-        print(f"   Rebalance frequency: {rebalance_frequency}")
-        print(f"   Number of rebalancing periods: {len(rebal_dates)}")
-        print(f"   First rebalance: {rebal_dates[0].strftime('%Y-%m-%d')}")
-        print(f"   Last rebalance: {rebal_dates[-1].strftime('%Y-%m-%d')}")
-        print(f"   Window type: {'Rolling (%d days)' % lookback_days if lookback_days else 'Expanding'}")
-        print()
+        _write_lines([
+            "\n🔄 Rolling Optimization (OUT-OF-SAMPLE)",
+            f"   Strategy: {strategy.upper()}",
+            f"   Rebalance frequency: {rebalance_frequency}",
+            f"   Number of rebalancing periods: {len(rebal_dates)}",
+            f"   First rebalance: {rebal_dates[0].strftime('%Y-%m-%d')}",
+            f"   Last rebalance: {rebal_dates[-1].strftime('%Y-%m-%d')}",
+            f"   Window type: {'Rolling (%d days)' % lookback_days if lookback_days else 'Expanding'}",
+            "",
+        ])
     
     # Initialize weights schedule
-    weights_schedule = pd.DataFrame(index=price_df.index, columns=symbols, dtype=float)
+    # Filled as an array: each rebalance writes one block of rows, starting at the first
+    # trading day on/after its date and running up to the next rebalance's first row
+    weights_arr = np.full((len(price_df), len(symbols)), np.nan)
+    period_starts = price_df.index.searchsorted(rebal_dates)
     
     # Track rebalancing history for analysis
     rebal_history = []
+    # Previous MPT solution, used to warm-start the next rebalance
+    last_w = None
+    
+    # Inputs that don't depend on the rebalance date: equal weights and Wassim's
+    # confidence (fundamentals are a single cross-sectional snapshot)
+    w_equal = equal_weight_weights(symbols)
+    c_wassim = pd.Series(0.5, index=symbols)  # Default neutral
+    if strategy == 'mpt' and fundamentals_df is not None:
+        try:
+            c_wassim = wassim_confidence(fundamentals_df)
+        except Exception:
+            pass
+    # Aligned to symbols once, so each rebalance combines the two confidences in one array op
+    # (same result as combine_confidence(...).reindex(symbols).fillna(0.5))
+    cw = c_wassim.reindex(symbols).fillna(0.5).to_numpy(dtype=float)
+    
+    # With gap-free prices, a training window's returns are rows train_start_idx+1..train_end_idx
+    # of the whole panel's returns, so the MPT covariance can be kept as running sums across
+    # rebalances. Panels with gaps take the per-window path below instead.
+    cov_state = None
+    if strategy == 'mpt':
+        returns_arr = price_df.pct_change(fill_method=None).to_numpy(dtype=float)
+        if len(returns_arr) > 1 and not np.isnan(returns_arr[1:]).any():
+            cov_state = RollingCovState(returns_arr)
     
     for i, rebal_date in enumerate(rebal_dates, 1):
         if verbose and (i % max(1, len(rebal_dates) // 10) == 0):
@@ -132,9 +198,9 @@ def rolling_optimize_weights(
             train_start_idx = max(0, train_end_idx - lookback_days + 1)
             train_data = price_df.iloc[train_start_idx:train_end_idx + 1]
         else:
-            # Expanding window: use all data from start
-            # loc with slicing handles missing exact dates gracefully
-            train_data = price_df.loc[:rebal_date]
+            # Expanding window: use all data from start up to the last row on/before rebal_date
+            train_start_idx, train_end_idx = 0, int(price_df.index.searchsorted(rebal_date, side='right')) - 1
+            train_data = price_df.iloc[:train_end_idx + 1]
         
         # Skip if insufficient data
         if len(train_data) < min_train_days // 2:
@@ -143,48 +209,44 @@ def rolling_optimize_weights(
         # Optimize weights based on strategy
         try:
             if strategy == 'equal':
-                w = equal_weight_weights(symbols)
+                w = w_equal
             
             elif strategy == 'invvol':
                 w = inverse_vol_weights(train_data, lookback_days=min(63, len(train_data) // 4))
             
             elif strategy == 'mpt':
-                # Build confidence scores using ONLY training data
-                c_wassim = pd.Series(0.5, index=symbols)  # Default neutral
-                if fundamentals_df is not None:
-                    try:
-                        c_wassim = wassim_confidence(fundamentals_df)
-                    except Exception:
-                        pass
-                
+                # Build price-based confidence using ONLY training data
                 c_yugo = yugo_confidence_from_prices(
                     train_data, 
                     lookback=min(126, len(train_data) // 2),
                     method="ema"
                 )
                 
-                c = combine_confidence(c_wassim, c_yugo, w_wassim=w_wassim, w_yugo=w_yugo)
-                c = c.reindex(symbols).fillna(0.5)
+                cy = c_yugo.reindex(symbols).fillna(0.5).to_numpy(dtype=float)
+                c = pd.Series(np.clip(w_wassim * cw + w_yugo * cy, 0.0, 1.0), index=symbols)
                 
                 # Map confidence to expected returns
                 mu = map_scores_to_expected_returns_from_confidence(c, ann_low=ann_low, ann_high=ann_high)
                 
-                # Compute covariance from training data returns
-                returns = compute_returns(train_data)
-                Sigma = sample_covariance(returns, lookback=min(252, len(returns)))
+                # Compute covariance from the last (up to) 252 training returns
+                if cov_state is not None and train_end_idx > train_start_idx:
+                    cov_lo = max(train_start_idx + 1, train_end_idx - 251)
+                    Sigma = pd.DataFrame(cov_state.covariance(cov_lo, train_end_idx + 1),
+                                         index=symbols, columns=symbols)
+                else:
+                    # Gaps are forward-filled within the window, as pct_change() does by default on pandas 2
+                    returns = train_data.ffill().pct_change(fill_method=None).dropna(how="all")
+                    Sigma = sample_covariance(returns, lookback=min(252, len(returns)))
                 
-                # Align and optimize
-                common = mu.index.intersection(Sigma.columns)
-                if len(common) < 2:
+                # mu and Sigma are both built on `symbols`, so they are already aligned
+                if len(symbols) < 2:
                     # Fallback to inverse vol
                     w = inverse_vol_weights(train_data)
                 else:
-                    mu = mu.loc[common]
-                    Sigma = Sigma.loc[common, common]
-                    w = max_sharpe_long_only(mu, Sigma, max_weight=max_weight)
-                    # Ensure full symbol coverage
-                    w = w.reindex(symbols).fillna(0.0)
-                    w = w / w.sum() if w.sum() > 0 else pd.Series(1.0 / len(symbols), index=symbols)
+                    w = max_sharpe_long_only(mu, Sigma, max_weight=max_weight, w_init=last_w).fillna(0.0)
+                    total = w.sum()
+                    w = w / total if total > 0 else pd.Series(1.0 / len(symbols), index=symbols)
+                    last_w = w
             
             else:
                 raise ValueError(f"Unknown strategy: {strategy}")
@@ -197,17 +259,8 @@ def rolling_optimize_weights(
             })
             
             # Apply weights from rebal_date forward until next rebalance (or end)
-            # Find the next rebalancing date
-            next_rebal_idx = i if i < len(rebal_dates) else None
-            if next_rebal_idx and next_rebal_idx < len(rebal_dates):
-                next_rebal_date = rebal_dates[next_rebal_idx]
-                mask = (weights_schedule.index >= rebal_date) & (weights_schedule.index < next_rebal_date)
-            else:
-                mask = weights_schedule.index >= rebal_date
-            
-            # Assign weights to this period
-            for symbol in symbols:
-                weights_schedule.loc[mask, symbol] = w.get(symbol, 0.0)
+            period_end = period_starts[i] if i < len(rebal_dates) else len(weights_arr)
+            weights_arr[period_starts[i - 1]:period_end] = w.reindex(symbols).fillna(0.0).to_numpy(dtype=float)
         
         except Exception as e:
             if verbose:
@@ -215,11 +268,13 @@ def rolling_optimize_weights(
             continue
     
     # Fill any remaining NaN with 0
-    weights_schedule = weights_schedule.fillna(0.0)
+    weights_schedule = pd.DataFrame(weights_arr, index=price_df.index, columns=symbols).fillna(0.0)
     
     if verbose:
-        print(f"\n✅ Rolling optimization complete: {len(rebal_history)} rebalancing events")
-        print(f"   Coverage: {(weights_schedule.sum(axis=1) > 0).sum()}/{len(weights_schedule)} days")
+        _write_lines([
+            f"\n✅ Rolling optimization complete: {len(rebal_history)} rebalancing events",
+            f"   Coverage: {(weights_schedule.sum(axis=1) > 0).sum()}/{len(weights_schedule)} days",
+        ])
     
     # Store rebalancing history as metadata
     weights_schedule.attrs['rebal_history'] = rebal_history
@@ -306,18 +361,18 @@ def analyze_weight_stability(weights_schedule: pd.DataFrame) -> Dict:
     Analyze how stable the portfolio weights are over time.
     High turnover indicates unstable optimization.
     """
-    # Calculate weight changes at each rebalancing
-    weight_changes = weights_schedule.diff().abs()
-    
-    # Sum across all positions to get total turnover per day
-    daily_turnover = weight_changes.sum(axis=1)
+    # Total absolute weight change per day (0 on the first day), one pass over the array
+    W = weights_schedule.to_numpy(dtype=float)
+    daily_turnover = np.zeros(len(W))
+    if len(W) > 1:
+        daily_turnover[1:] = np.nansum(np.abs(np.diff(W, axis=0)), axis=1)
     
     # Only consider rebalancing days (where turnover > 0)
     rebal_turnover = daily_turnover[daily_turnover > 0]
     
     metrics = {
-        'mean_turnover_per_rebalance': float(rebal_turnover.mean()),
-        'max_turnover': float(daily_turnover.max()),
+        'mean_turnover_per_rebalance': float(rebal_turnover.mean()) if len(rebal_turnover) else float('nan'),
+        'max_turnover': float(daily_turnover.max()) if len(daily_turnover) else float('nan'),
         'num_rebalancing_events': int((daily_turnover > 0).sum()),
         'avg_days_between_rebalance': float(len(weights_schedule) / max((daily_turnover > 0).sum(), 1)),
     }
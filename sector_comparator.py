@@ -6,6 +6,7 @@ Computes percentile ranks and z-scores for key metrics within a sector.
 from __future__ import annotations
 
 from typing import Optional
+import warnings
 import numpy as np
 import pandas as pd
 
@@ -47,21 +48,31 @@ class SectorComparator:
         
         # Metrics to compare
         metrics = ['pb_ratio', 'pe_ratio', 'roe', 'roa', 'profit_margin', 'debt_to_equity']
-        
-        for metric in metrics:
-            if metric in sector_df.columns:
-                # Percentile rank (0-100) - only for non-NaN values
-                sector_df[f'{metric}_percentile'] = sector_df[metric].rank(pct=True, na_option='keep') * 100
-                
-                # Z-score - skip NaN values in calculations
-                mean_val = sector_df[metric].mean(skipna=True)
-                std_val = sector_df[metric].std(skipna=True)
-                
-                # Only compute z-score if we have valid data
-                if pd.notna(mean_val) and pd.notna(std_val) and std_val > 0:
-                    sector_df[f'{metric}_zscore'] = (sector_df[metric] - mean_val) / std_val
-                else:
-                    sector_df[f'{metric}_zscore'] = np.nan
+        present = [m for m in metrics if m in sector_df.columns]
+        
+        if present:
+            from scipy.stats import rankdata
+            
+            M = sector_df[present].to_numpy(dtype=float)
+            
+            # Percentile rank (0-100) - only for non-NaN values
+            counts = (~np.isnan(M)).sum(axis=0)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                pct = rankdata(M, axis=0, nan_policy='omit') / counts * 100
+            
+            # Z-score - skip NaN values; only where the metric has a positive spread
+            with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+                warnings.simplefilter("ignore", RuntimeWarning)
+                mean_val = np.nanmean(M, axis=0)
+                std_val = np.nanstd(M, axis=0, ddof=1)
+                std_val = np.where(std_val > 0, std_val, np.nan)
+                Z = (M - mean_val) / std_val
+            
+            new_cols = {}
+            for j, metric in enumerate(present):
+                new_cols[f'{metric}_percentile'] = pct[:, j]
+                new_cols[f'{metric}_zscore'] = Z[:, j]
+            sector_df = sector_df.assign(**new_cols)
         
         self.comparison_df = sector_df
         return sector_df
@@ -0,0 +1,84 @@
+"""
+Table-driven checks for the agent-output parsing in interactive_cli
+(fallback BUY/SELL/HOLD classification and MY PICKS / CONFIDENCE extraction).
+"""
+
+import pytest
+
+from interactive_cli import InteractiveFinancialInterface
+
+
+CLASSIFY_CASES = [
+    # Explicit recommendations win, BUY before SELL before HOLD
+    ("After reviewing the data I RECOMMEND BUY for this name.", 'BUY'),
+    ("Recommendation: sell. The margins are falling.", 'SELL'),
+    ("RECOMMENDATION: HOLD until the next earnings call.", 'HOLD'),
+    ("I recommend hold, though a buy case exists and sellers are active.", 'HOLD'),
+    ("I RECOMMEND SELL now, but I RECOMMEND BUY on a pullback.", 'BUY'),
+    ("RECOMMEND HOLD for now; later RECOMMENDATION: SELL.", 'SELL'),
+    # Explicit recommendations ignore debating language
+    ("Let's debate it, but I recommend buy.", 'BUY'),
+    # Bare keywords only count when the message is not debating
+    ("This is a clear buy on valuation.", 'BUY'),
+    ("Strong sell signal from the regime model.", 'SELL'),
+    ("Buy the dip or sell the rally?", 'SELL'),
+    ("We should debate whether to buy.", None),
+    ("Open for DEBATE: sell or keep?", None),
+    # Keywords inside longer words still count, as in the substring-based original
+    ("The buyback program supports the shares.", 'BUY'),
+    ("No clear view yet, more data needed.", None),
+    ("", None),
+]
+
+
+@pytest.mark.parametrize("content,expected", CLASSIFY_CASES)
+def test_classify_recommendation(content, expected):
+    assert InteractiveFinancialInterface._classify_recommendation(content) == expected
+
+
+PICKS_CASES = [
+    # Bracketed picks with colon confidence
+    ("Final view.\nMY PICKS: [AAPL, MSFT, NVDA, AMD, INTC]\nCONFIDENCE: 0.85",
+     (['AAPL', 'MSFT', 'NVDA', 'AMD', 'INTC'], 0.85)),
+    # Without brackets, lowercase, confidence without a colon
+    ("my picks: aapl, msft, txn\nconfidence 0.7",
+     (['AAPL', 'MSFT', 'TXN'], 0.7)),
+    # Placeholders, '...' and overlong tokens are dropped
+    ("MY PICKS: [SYMBOL1, AAPL, ..., TOOLONG, MU]\nCONFIDENCE: .6",
+     (['AAPL', 'MU'], 0.6)),
+    # Missing confidence defaults to 0.5
+    ("MY PICKS: [ORCL, CRM]", (['ORCL', 'CRM'], 0.5)),
+    # The colon form is preferred when both forms appear
+    ("CONFIDENCE 0.4 at first, but CONFIDENCE: 0.9 now. MY PICKS: [AAPL]",
+     (['AAPL'], 0.9)),
+    # Template echoes are skipped: only placeholders, or a zero confidence
+    ("MY PICKS: [SYMBOL1, SYMBOL2, ...]\nCONFIDENCE: 0.XX", None),
+    ("MY PICKS: [AAPL, MSFT]\nCONFIDENCE: 0.XX", None),
+    ("No picks in this message. CONFIDENCE: 0.8", None),
+]
+
+
+@pytest.mark.parametrize("content,expected", PICKS_CASES)
+def test_extract_stock_picks(content, expected):
+    iface = InteractiveFinancialInterface()
+    picks = iface._extract_stock_picks([{'speaker': 'Wassim_Fundamental_Agent', 'message': content}])
+    if expected is None:
+        assert picks == {}
+    else:
+        symbols, confidence = expected
+        assert picks == {'Wassim': {'picks': symbols, 'confidence': confidence}}
+
+
+def test_extract_stock_picks_keeps_latest_valid_entry_per_agent():
+    iface = InteractiveFinancialInterface()
+    history = [
+        {'speaker': 'Wassim_Fundamental_Agent', 'message': "MY PICKS: [AAPL, MSFT]\nCONFIDENCE: 0.6"},
+        {'speaker': 'Yugo_Valuation_Agent', 'message': "MY PICKS: [AMD]\nCONFIDENCE: 0.7"},
+        {'speaker': 'Wassim_Fundamental_Agent', 'message': "MY PICKS: [NVDA, INTC]\nCONFIDENCE: 0.8"},
+        # A later placeholder echo does not replace Yugo's real picks
+        {'speaker': 'Yugo_Valuation_Agent', 'message': "MY PICKS: [SYMBOL1]\nCONFIDENCE: 0.9"},
+    ]
+    picks = iface._extract_stock_picks(history)
+    assert list(picks) == ['Wassim', 'Yugo']
+    assert picks['Wassim'] == {'picks': ['NVDA', 'INTC'], 'confidence': 0.8}
+    assert picks['Yugo'] == {'picks': ['AMD'], 'confidence': 0.7}
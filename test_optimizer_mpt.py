@@ -0,0 +1,43 @@
+"""
+Checks the NumPy helpers in optimizer_mpt against the pandas/scipy versions they replace.
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from optimizer_mpt import _average_rank, _ema
+
+
+def test_average_rank_matches_series_rank():
+    rng = np.random.default_rng(3)
+    cases = [
+        np.array([0.3, 0.1, 0.2]),
+        np.array([0.5, 0.5, 0.1, 0.5, 0.9]),           # three-way tie
+        np.array([1.0, 1.0, 1.0, 1.0]),                # all tied
+        np.array([np.nan, 0.2, 0.2, np.nan, -1.0]),    # NaNs stay NaN, ties among the rest
+        np.array([np.nan, np.nan]),
+        np.array([], dtype=float),
+        np.array([7.0]),
+        rng.integers(0, 5, size=50).astype(float),     # many ties
+        rng.normal(size=200),
+    ]
+    for values in cases:
+        expected = pd.Series(values).rank(method='average').to_numpy()
+        np.testing.assert_array_equal(_average_rank(values), expected)
+
+
+def test_ema_matches_pandas_ewm(monkeypatch):
+    rng = np.random.default_rng(4)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, size=(300, 6)), axis=0))
+    for alpha in (2.0 / 21.0, 0.5, 1.0):
+        expected = pd.DataFrame(prices).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+        np.testing.assert_allclose(_ema(prices, alpha), expected, rtol=1e-12)
+        np.testing.assert_allclose(_ema(prices[:1], alpha), prices[:1], rtol=1e-12)
+
+    # Same numbers from the pure-NumPy fallback used when scipy.signal is unavailable
+    monkeypatch.setitem(sys.modules, 'scipy.signal', None)
+    alpha = 2.0 / 21.0
+    expected = pd.DataFrame(prices).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    np.testing.assert_allclose(_ema(prices, alpha), expected, rtol=1e-12)
@@ -0,0 +1,31 @@
+"""
+Checks inverse_vol_weights against the pandas formulation it replaced.
+"""
+
+import numpy as np
+import pandas as pd
+
+from portfolio_constructor import inverse_vol_weights
+
+
+def reference_inverse_vol_weights(price_df, lookback_days=63):
+    """Original pandas version, with pct_change's pandas-2 forward fill spelled out"""
+    ret = price_df.sort_index().ffill().pct_change(fill_method=None).dropna(how="all")
+    vol = ret.iloc[-lookback_days:].std(ddof=0)
+    inv_vol = 1.0 / vol.replace(0.0, np.nan)
+    inv_vol = inv_vol.replace([np.inf, -np.inf], np.nan).fillna(0.0)
+    return inv_vol / inv_vol.sum()
+
+
+def test_inverse_vol_weights_forward_fill_gaps():
+    rng = np.random.default_rng(5)
+    idx = pd.bdate_range('2022-01-03', periods=300)
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, size=(300, 5)), axis=0)),
+                          index=idx, columns=list('ABCDE'))
+    prices.iloc[:40, 1] = np.nan           # late listing
+    prices.iloc[250:256, 2] = np.nan       # gap inside the lookback window
+    prices.iloc[rng.choice(300, 30, replace=False), 3] = np.nan  # scattered missing days
+    for lookback in (20, 63, 252):
+        got = inverse_vol_weights(prices, lookback_days=lookback)
+        pd.testing.assert_series_equal(got, reference_inverse_vol_weights(prices, lookback),
+                                       check_exact=False, rtol=1e-12)
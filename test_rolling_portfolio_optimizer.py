@@ -0,0 +1,45 @@
+"""
+Checks RollingCovState's running-sum covariance against np.cov on every window.
+"""
+
+import numpy as np
+
+from rolling_portfolio_optimizer import RollingCovState
+
+
+def check_windows(values, windows):
+    state = RollingCovState(values)
+    for lo, hi in windows:
+        got = state.covariance(lo, hi)
+        expected = np.cov(values[lo:hi], rowvar=False, ddof=0)
+        # Tolerance relative to the variance scale of the window
+        scale = np.abs(np.diag(expected)).max()
+        np.testing.assert_allclose(got, expected, rtol=0, atol=1e-10 * scale,
+                                   err_msg=f"window [{lo}, {hi})")
+
+
+def test_rolling_windows_match_np_cov():
+    # Ten years of daily returns for 8 assets, trailing 252-day windows stepped monthly,
+    # as rolling_optimize_weights uses it
+    rng = np.random.default_rng(0)
+    returns = rng.normal(0.0005, 0.02, size=(2520, 8))
+    windows = [(max(1, hi - 252), hi) for hi in range(127, len(returns) + 1, 21)]
+    check_windows(returns, windows)
+
+
+def test_expanding_and_irregular_windows_match_np_cov():
+    rng = np.random.default_rng(1)
+    returns = rng.normal(0.0003, 0.015, size=(1000, 5))
+    expanding = [(0, hi) for hi in range(50, 1001, 50)]
+    # Overlapping steps, a jump past the old window, and a window that moves backwards
+    irregular = [(0, 100), (10, 130), (300, 400), (310, 420), (50, 150), (60, 160), (900, 1000)]
+    check_windows(returns, expanding)
+    check_windows(returns, irregular)
+
+
+def test_long_window_with_offset_mean():
+    # A mean far above the daily spread is the case where running sums lose precision
+    rng = np.random.default_rng(2)
+    values = 0.05 + rng.normal(0.0, 0.01, size=(5000, 4))
+    windows = [(hi - 2000, hi) for hi in range(2000, 5001, 21)]
+    check_windows(values, windows)